@@ -0,0 +1,2 @@
+# Lapisan data, scoring & agregasi dashboard. Modul di paket ini TIDAK boleh
+# mengimpor streamlit agar bisa dipakai job batch maupun worker terpisah.
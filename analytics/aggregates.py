@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from analytics.data import REGION_HIERARCHY
+from analytics.sketch import QuantileSketch
+from analytics.stats import collapse, sufficient_stats
+
+# --- AGREGAT HALAMAN (tanpa Streamlit) ---
+# Semua agregat yang dibaca halaman dashboard. Bisa dihitung saat request
+# (dashboard.py) atau dibangun semalam oleh `python -m analytics.precompute`.
+
+ALL_PROVINCES = 'Semua Provinsi'
+
+# Kolom aditif yang dijumlahkan di setiap level hierarki
+REGIONAL_SUM_COLS = ['Dana_Diberikan_M', 'Outstanding_Pinjaman_M', 'Lender_Accounts', 'Borrower_Active_Entities', 'Population_K']
+
+# Metrik yang diranking di halaman regional (TOP 10)
+REGIONAL_RANKING_COLS = ['Lender_Borrower_Ratio', 'TWP_90']
+
+# Kombinasi (kelompok skor, kolom kategori) yang ditampilkan sebagai heatmap di halaman survei
+HEATMAP_SPECS = [
+    ('literasi', 'Pendidikan'),
+    ('literasi', 'Pekerjaan'),
+    ('perilaku', 'Pendapatan'),
+    ('keputusan', 'Pendidikan'),
+    ('kesejahteraan', 'Pendapatan'),
+]
+
+# Kolom kategori & skor komposit untuk cube provinsi x kategori
+SURVEY_CATEGORY_COLS = ['Pendidikan', 'Pendapatan', 'Pekerjaan', 'Status_Tinggal', 'Status_Nikah', 'Gender']
+SURVEY_SCORE_COLS = ['Skor_Literasi', 'Skor_Perilaku', 'Skor_Keputusan', 'Skor_Kesejahteraan']
+
+# Sel quantile sketch (frame, kolom kategori, kolom nilai): box plot survei & KPI persentil profil
+SKETCH_SPECS = [('survey', category_col, score_col) for category_col in ['Pendidikan', 'Pendapatan'] for score_col in SURVEY_SCORE_COLS] + [
+    ('profile', 'Cluster', 'Age'),
+    ('profile', 'Cluster', 'Prob_Default'),
+]
+
+
+def build_regional_rollups(df):
+    # Materialisasi agregat di setiap level hierarki (level halus -> kasar).
+    # Level terhalus dihitung sekali dari tabel dasar; level di atasnya dijumlahkan
+    # dari rollup level di bawahnya, jadi drill-down tidak pernah memindai ulang df.
+    levels = [lvl for lvl in REGION_HIERARCHY if lvl in df.columns]
+    work = df.assign(
+        TWP_x_Outstanding=df['TWP_90'] * df['Outstanding_Pinjaman_M'],  # untuk TWP 90% tertimbang outstanding
+        N_Units=1,
+    )
+    sums = REGIONAL_SUM_COLS + ['TWP_x_Outstanding', 'N_Units']
+
+    rollups = {}
+    current = work.groupby(levels, sort=False)[sums].sum()
+    for depth in range(len(levels), 0, -1):
+        if depth < len(levels):
+            current = current.groupby(level=levels[:depth], sort=False).sum()
+        rollup = current.reset_index()
+        # Metrik turunan dihitung dari jumlah, bukan dirata-rata ulang
+        rollup['Lender_Borrower_Ratio'] = rollup['Lender_Accounts'] / (rollup['Borrower_Active_Entities'] + 1e-6)
+        rollup['TWP_90'] = rollup['TWP_x_Outstanding'] / rollup['Outstanding_Pinjaman_M'].replace(0, np.nan)
+        rollups[levels[depth - 1]] = rollup.drop(columns='TWP_x_Outstanding')
+    return rollups
+
+
+def build_regional_rankings(rollups, n=10):
+    df_province = rollups['Province']
+    return {col: df_province.nlargest(n, col).reset_index(drop=True) for col in REGIONAL_RANKING_COLS}
+
+
+def province_slice(stats, province):
+    # Statistik per kategori untuk satu provinsi, atau gabungan semua provinsi (dijumlahkan)
+    keep = [name for name in stats.index.names if name != 'province']
+    if province != ALL_PROVINCES:
+        if province not in stats.index.get_level_values('province'):
+            return None
+        stats = stats.loc[[province]]
+    return collapse(stats, keep)
+
+
+def build_heatmap_stats(df_survey, score_groups):
+    # Kunci: (kelompok skor, kolom kategori) -> sufficient statistics provinsi x kategori
+    # per pertanyaan; pivot rata-rata/CI untuk filter provinsi mana pun diturunkan darinya
+    heatmap_stats = {}
+    for group, category_col in HEATMAP_SPECS:
+        if category_col not in df_survey.columns or df_survey[category_col].nunique() == 0:
+            continue
+        heatmap_stats[(group, category_col)] = sufficient_stats(df_survey, ['province', category_col], score_groups[group])
+    return heatmap_stats
+
+
+def build_province_cube(df_survey):
+    # Cube provinsi x kategori: sufficient statistics (n, jumlah, jumlah kuadrat, versi
+    # tertimbang) per skor komposit. Bersifat aditif, sehingga rata-rata & CI untuk gabungan
+    # provinsi cukup dijumlahkan lalu diringkas (analytics.stats.summarize).
+    score_cols = [col for col in SURVEY_SCORE_COLS if col in df_survey.columns]
+    cubes = {}
+    for category_col in SURVEY_CATEGORY_COLS:
+        if category_col not in df_survey.columns:
+            continue
+        cubes[category_col] = sufficient_stats(df_survey, ['province', category_col], score_cols)
+    return cubes
+
+
+def build_sketch_cells(df, category_col, value_col):
+    # Series (provinsi, kategori) -> QuantileSketch
+    groups = df.groupby(['province', category_col], sort=True, observed=True)[value_col]
+    cells = {key: QuantileSketch.from_values(values.to_numpy(dtype=float)) for key, values in groups}
+    index = pd.MultiIndex.from_tuples(list(cells), names=['province', category_col])
+    return pd.Series(list(cells.values()), index=index, dtype=object)
+
+
+def build_quantile_sketches(df_profile, df_survey):
+    frames = {'profile': df_profile, 'survey': df_survey}
+    sketches = {}
+    for frame, category_col, value_col in SKETCH_SPECS:
+        df = frames[frame]
+        if category_col in df.columns and value_col in df.columns:
+            sketches[(frame, category_col, value_col)] = build_sketch_cells(df, category_col, value_col)
+    return sketches
+
+
+def merge_sketch_cells(cells, province, by_category=True):
+    # Gabungan sketch untuk filter provinsi: dict per kategori, atau satu sketch untuk semua sel
+    if province != ALL_PROVINCES:
+        if province not in cells.index.get_level_values('province'):
+            return None
+        cells = cells.loc[[province]]
+    if not by_category:
+        return QuantileSketch.merge_all(cells.tolist())
+    return {category: QuantileSketch.merge_all(group.tolist()) for category, group in cells.groupby(level=1, sort=True)}
+
+
+def build_aggregates(df_profile, df_regional, df_survey, score_groups):
+    rollups = build_regional_rollups(df_regional)
+    return {
+        'regional_rollups': rollups,
+        'regional_rankings': build_regional_rankings(rollups),
+        'heatmap_stats': build_heatmap_stats(df_survey, score_groups),
+        'province_cube': build_province_cube(df_survey),
+        'quantile_sketches': build_quantile_sketches(df_profile, df_survey),
+    }
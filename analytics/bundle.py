@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from datetime import datetime, timezone
+
+from analytics.data import SOURCE_FILES, DataFileNotFoundError
+from analytics.shared_frames import open_arrow_frames, write_arrow_frames
+
+# --- BUNDLE AGREGAT BERVERSI ---
+# Struktur di disk:
+#   <root>/LATEST                   -> nama versi aktif
+#   <root>/<versi>/manifest.json    -> metadata (format, waktu build, hash file sumber)
+#   <root>/<versi>/frames/*.arrow   -> df_profile, df_regional, df_survey hasil pre-proses
+#                                      (Arrow IPC, dibuka memory-mapped; lihat analytics.shared_frames)
+#   <root>/<versi>/score_groups.json
+#   <root>/<versi>/aggregates.pkl   -> rollup, ranking, statistik heatmap, cube provinsi,
+#                                      quantile sketch per sel provinsi x kategori
+
+BUNDLE_FORMAT = 4
+LATEST_POINTER = "LATEST"
+FRAME_NAMES = ['profile', 'regional', 'survey']
+
+
+def source_fingerprint(data_dir):
+    digests = {}
+    for name, filename in SOURCE_FILES.items():
+        try:
+            with open(os.path.join(data_dir, filename), 'rb') as f:
+                digests[filename] = hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            raise DataFileNotFoundError(f"File '{filename}' tidak ditemukan. Pastikan file Excel tersedia.") from None
+    return digests
+
+
+def write_bundle(root, frames, score_groups, aggregates, sources, notices=(), keep=5):
+    # Ditulis ke direktori sementara lalu di-rename, dan pointer LATEST diganti atomik,
+    # sehingga dashboard yang sedang membaca tidak pernah melihat bundle setengah jadi.
+    created_at = datetime.now(timezone.utc)
+    source_hash = hashlib.sha256(json.dumps(sources, sort_keys=True).encode()).hexdigest()[:8]
+    version = f"{created_at:%Y%m%dT%H%M%SZ}-{source_hash}"
+
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = os.path.join(root, f".tmp-{version}")
+    write_arrow_frames({name: frames[name] for name in FRAME_NAMES}, os.path.join(tmp_dir, "frames"))
+    with open(os.path.join(tmp_dir, "score_groups.json"), 'w', encoding='utf-8') as f:
+        json.dump(score_groups, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(tmp_dir, "aggregates.pkl"), 'wb') as f:
+        pickle.dump(aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'created_at': created_at.isoformat(),
+        'sources': sources,
+        'rows': {name: int(len(frames[name])) for name in FRAME_NAMES},
+        'notices': list(notices),
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(tmp_dir, os.path.join(root, version))
+    pointer_tmp = os.path.join(root, f".{LATEST_POINTER}.tmp")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(root, LATEST_POINTER))
+
+    prune_bundles(root, keep)
+    return version
+
+
+def read_manifest(root, version):
+    try:
+        with open(os.path.join(root, version, "manifest.json"), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_compatible(root, version):
+    # Bundle dari format lain (mis. ditulis sebelum deploy yang menaikkan BUNDLE_FORMAT) dilewati
+    manifest = read_manifest(root, version)
+    return manifest is not None and manifest.get('format') == BUNDLE_FORMAT
+
+
+def list_versions(root, compatible_only=False):
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    versions = sorted(
+        name for name in names
+        if not name.startswith('.') and os.path.isfile(os.path.join(root, name, "manifest.json"))
+    )
+    if compatible_only:
+        versions = [version for version in versions if is_compatible(root, version)]
+    return versions
+
+
+def prune_bundles(root, keep):
+    active = read_pointer(root)
+    for version in list_versions(root)[:-keep] if keep > 0 else []:
+        if version != active:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def read_pointer(root):
+    try:
+        with open(os.path.join(root, LATEST_POINTER), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def latest_version(root):
+    # Versi yang ditunjuk LATEST jika formatnya cocok; jika tidak, versi kompatibel terbaru.
+    # None = belum ada bundle yang bisa dibaca kode ini (dashboard menghitung sendiri).
+    version = read_pointer(root)
+    if version is not None and is_compatible(root, version):
+        return version
+    compatible = list_versions(root, compatible_only=True)
+    return compatible[-1] if compatible else None
+
+
+def read_bundle(root, version=None):
+    # Frame dikembalikan memory-mapped & read-only, bersama rentang baris per provinsi
+    version = version or latest_version(root)
+    if version is None:
+        raise FileNotFoundError(f"Tidak ada bundle agregat di '{root}'. Jalankan `python -m analytics.precompute` terlebih dahulu.")
+    path = os.path.join(root, version)
+    with open(os.path.join(path, "manifest.json"), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Format bundle {manifest.get('format')} tidak didukung (diharapkan {BUNDLE_FORMAT}).")
+
+    frames, row_ranges = open_arrow_frames(os.path.join(path, "frames"))
+    with open(os.path.join(path, "score_groups.json"), encoding='utf-8') as f:
+        score_groups = json.load(f)
+    with open(os.path.join(path, "aggregates.pkl"), 'rb') as f:
+        aggregates = pickle.load(f)
+    return manifest, frames, row_ranges, score_groups, aggregates
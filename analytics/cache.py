@@ -0,0 +1,332 @@
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+# --- CACHE BERSAMA LINTAS REPLIKA ---
+# @st.cache_data hanya berlaku per proses. Backend di sini menyimpan hasil komputasi
+# (bytes hasil pickle) di tempat yang bisa dibaca semua replika: folder bersama,
+# file SQLite, atau server Redis. Dipilih lewat URL, mis.:
+#   file:///srv/dashboard/cache
+#   sqlite:///srv/dashboard/cache.db
+#   redis://cache-host:6379/0
+#   memory://            (per proses, default untuk pengembangan)
+#   local-redis://       (stand-in Redis di memori, untuk uji tanpa server)
+# Kontrak backend (termasuk RedisBackend + memoize via local-redis://) diuji di
+# tests/test_cache.py.
+
+KEY_PREFIX = "dashboard"
+DEFAULT_LOCK_TTL = 300      # detik; kunci kedaluwarsa jika replika pemegang kunci mati
+DEFAULT_WAIT_TIMEOUT = 300  # detik; batas replika lain menunggu hasil komputasi
+
+
+class CacheBackend(ABC):
+    # Antarmuka minimal: get/set bytes + kunci sederhana (set-if-absent dengan TTL)
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+    @abstractmethod
+    def add(self, key, value, ttl=None):
+        # Set hanya jika key belum ada; True jika berhasil
+        ...
+
+
+class MemoryBackend(CacheBackend):
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self._lock:
+            return self._alive(key)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._alive(key) is not None:
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+
+class FileSystemBackend(CacheBackend):
+    # Satu file per key di folder bersama (mis. NFS). Penulisan atomik via rename.
+    # Setiap file berisi (expires_at, value, token); token unik per penulisan dipakai
+    # untuk mengambil alih kunci kedaluwarsa secara atomik (lihat add).
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, hashlib.sha256(key.encode()).hexdigest())
+
+    def _entry(self, value, ttl):
+        return (time.time() + ttl if ttl else None, value, uuid.uuid4().hex)
+
+    def _load(self, path):
+        # (expires_at, value, token), atau None jika file tidak ada
+        try:
+            with open(path, 'rb') as f:
+                entry = tuple(pickle.load(f))
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError):
+            # Entri setengah ditulis (O_EXCL baru dibuat) dianggap hidup; jika penulisnya mati,
+            # entri kosong ini kedaluwarsa setelah DEFAULT_LOCK_TTL sejak file dibuat
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            return (stat.st_mtime + DEFAULT_LOCK_TTL, None, f"partial-{stat.st_ino}-{stat.st_mtime_ns}")
+        return entry + (None,) * (3 - len(entry))  # entri format lama tanpa token
+
+    def _read(self, path):
+        entry = self._load(path)
+        if entry is None or entry[1] is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return value
+
+    def _write(self, path, entry):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        return self._read(self._path(key))
+
+    def set(self, key, value, ttl=None):
+        self._write(self._path(key), self._entry(value, ttl))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def add(self, key, value, ttl=None):
+        path = self._path(key)
+        entry = self._entry(value, ttl)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            return True
+
+        current = self._load(path)
+        if current is None:
+            return False  # baru saja dilepas; pemanggil mencoba lagi pada putaran berikutnya
+        expires_at, _, stale_token = current
+        if expires_at is None or expires_at > time.time():
+            return False
+
+        # Kunci kedaluwarsa diambil alih lewat file penanda per token: O_EXCL menjamin hanya
+        # SATU replika yang boleh mengganti entri kedaluwarsa ini. Penggantian memakai
+        # os.replace (tanpa jeda "hapus lalu buat" yang bisa menimpa kunci baru replika lain),
+        # lalu dibaca ulang untuk memastikan entri di disk memang milik pemanggil ini.
+        marker = f"{path}.takeover.{stale_token}"
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        self._prune_markers(path, ttl)
+        current = self._load(path)
+        if current is None or current[2] != stale_token:
+            return False  # entri sudah berganti sejak dibaca
+        self._write(path, entry)
+        current = self._load(path)
+        return current is not None and current[2] == entry[2]
+
+    def _prune_markers(self, path, ttl):
+        # Penanda lama tidak diperlukan lagi: setelah satu TTL, entri pengganti pun sudah kedaluwarsa
+        prefix = f"{os.path.basename(path)}.takeover."
+        cutoff = time.time() - max(ttl or 0, DEFAULT_LOCK_TTL)
+        for name in os.listdir(self.root):
+            if name.startswith(prefix):
+                marker = os.path.join(self.root, name)
+                try:
+                    if os.path.getmtime(marker) < cutoff:
+                        os.remove(marker)
+                except FileNotFoundError:
+                    pass
+
+
+class SQLiteBackend(CacheBackend):
+    # Satu file SQLite bersama; koneksi per thread karena objek sqlite3 tidak thread-safe
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, sqlite3.Binary(value), time.time() + ttl if ttl else None))
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+            cursor = conn.execute("INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                                  (key, sqlite3.Binary(value), now + ttl if ttl else None))
+            return cursor.rowcount == 1
+
+
+class RedisBackend(CacheBackend):
+    # Menerima klien apa pun dengan antarmuka redis-py: get, set(ex=, nx=), delete
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, value, ex=int(ttl) if ttl else None, nx=True))
+
+
+class LocalRedis:
+    # Stand-in Redis di memori dengan subset perintah yang dipakai RedisBackend
+
+    def __init__(self):
+        self._store = MemoryBackend()
+
+    def get(self, name):
+        return self._store.get(name)
+
+    def set(self, name, value, ex=None, nx=False):
+        if isinstance(value, str):
+            value = value.encode()
+        if nx:
+            return True if self._store.add(name, value, ex) else None
+        self._store.set(name, value, ex)
+        return True
+
+    def delete(self, *names):
+        for name in names:
+            self._store.delete(name)
+        return len(names)
+
+
+def backend_from_url(url):
+    parsed = urlparse(url)
+    if parsed.scheme in ('', 'memory'):
+        return MemoryBackend()
+    if parsed.scheme in ('file', 'sqlite'):
+        # file://cache akan terbaca sebagai host "cache" dengan path kosong: minta path absolut
+        if parsed.netloc or not parsed.path.startswith('/'):
+            raise ValueError(f"URL cache '{url}' harus memakai path absolut, mis. {parsed.scheme}:///srv/dashboard/cache")
+        if parsed.scheme == 'file':
+            return FileSystemBackend(parsed.path)
+        return SQLiteBackend(parsed.path)
+    if parsed.scheme == 'local-redis':
+        return RedisBackend(LocalRedis())
+    if parsed.scheme in ('redis', 'rediss'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("Backend redis:// membutuhkan paket 'redis' (pip install redis).") from None
+        return RedisBackend(redis.Redis.from_url(url))
+    raise ValueError(f"Skema cache tidak dikenal: '{parsed.scheme}'")
+
+
+def cache_key(namespace, *parts):
+    digest = hashlib.sha256(pickle.dumps(parts, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()[:32]
+    return f"{KEY_PREFIX}:{namespace}:{digest}"
+
+
+def memoize(backend, key, compute, ttl=None, lock_ttl=DEFAULT_LOCK_TTL, wait_timeout=DEFAULT_WAIT_TIMEOUT, poll_interval=0.5):
+    # Ambil dari cache bersama; jika kosong hanya SATU replika (pemegang kunci) yang
+    # menghitung, replika lain menunggu hasilnya alih-alih menghitung ulang.
+    blob = backend.get(key)
+    if blob is not None:
+        return pickle.loads(blob)
+
+    lock_key = f"{key}:lock"
+    deadline = time.time() + wait_timeout
+    have_lock = backend.add(lock_key, b"1", ttl=lock_ttl)
+    while not have_lock:
+        time.sleep(poll_interval)
+        blob = backend.get(key)
+        if blob is not None:
+            return pickle.loads(blob)
+        if time.time() >= deadline:
+            break  # pemegang kunci terlalu lama; hitung sendiri
+        have_lock = backend.add(lock_key, b"1", ttl=lock_ttl)
+
+    try:
+        blob = backend.get(key)
+        if blob is not None:
+            return pickle.loads(blob)
+        value = compute()
+        backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl=ttl)
+        return value
+    finally:
+        if have_lock:
+            backend.delete(lock_key)
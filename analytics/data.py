@@ -0,0 +1,141 @@
+import os
+import warnings
+
+import pandas as pd
+
+from analytics.scoring import score_survey
+from analytics.stats import WEIGHT_COL, population_weights
+
+# --- DATA SUMBER & PRE-PROSES (tanpa Streamlit) ---
+# Dipakai bersama oleh dashboard.py dan job batch `python -m analytics.precompute`.
+
+SOURCE_FILES = {
+    'profile': "profile_merged.xlsx",
+    'regional': "regional_filled_fix.xlsx",
+    'survey': "survey_clean.xlsx",
+}
+
+# Hierarki regional (level kasar -> halus). Level yang kolomnya belum ada di data
+# (mis. 'Regency' untuk kabupaten/kota) otomatis dilewati.
+REGION_HIERARCHY = ['Island_Group', 'Province', 'Regency']
+
+# Keanggotaan kelompok pulau; provinsi di luar daftar masuk ke ISLAND_GROUP_DEFAULT
+ISLAND_GROUP_PROVINCES = {
+    'Jawa': ['DKI Jakarta', 'Jawa Barat', 'Jawa Tengah', 'Jawa Timur', 'Banten', 'DI Yogyakarta'],
+}
+ISLAND_GROUP_DEFAULT = 'Non-Jawa'
+PROVINCE_TO_ISLAND_GROUP = {prov: group for group, provs in ISLAND_GROUP_PROVINCES.items() for prov in provs}
+
+
+class DataFileNotFoundError(FileNotFoundError):
+    pass
+
+
+class DataWarning(UserWarning):
+    pass
+
+
+def read_source(data_dir, name):
+    path = os.path.join(data_dir, SOURCE_FILES[name])
+    try:
+        return pd.read_excel(path, sheet_name=0)
+    except FileNotFoundError:
+        raise DataFileNotFoundError(f"File '{SOURCE_FILES[name]}' tidak ditemukan. Pastikan file Excel tersedia.") from None
+
+
+def load_and_preprocess_data(data_dir="."):
+    # Menggunakan nama file lengkap yang terdeteksi dari unggahan pengguna
+    df_profile = read_source(data_dir, 'profile')
+    df_regional = read_source(data_dir, 'regional')
+    df_survey = read_source(data_dir, 'survey')
+
+
+    # --- Preprocessing Regional Data ---
+    regional_cols = {
+        'Provinsi': 'Province',
+        'Jumlah Dana yang Diberikan (Rp miliar)': 'Dana_Diberikan_M',
+        'Outstanding Pinjaman (Rp miliar)': 'Outstanding_Pinjaman_M',
+        'Jumlah Rekening Pemberi Pinjaman (akun)': 'Lender_Accounts',
+        'Jumlah Rekening Penerima Pinjaman Aktif (entitas)': 'Borrower_Active_Entities',
+        'TWP 90%': 'TWP_90',
+        'Jumlah Penduduk (Ribu)': 'Population_K',
+        'Pinjaman_per_Kapita': 'Loan_Per_Capita',
+        'Efisiensi_P2P': 'P2P_Efficiency'
+    }
+    df_regional.rename(columns=regional_cols, inplace=True)
+
+    # Menambahkan kelompok pulau (Jawa vs Non-Jawa) dengan lookup vektor, bukan apply per baris
+    df_regional['Island_Group'] = df_regional['Province'].map(PROVINCE_TO_ISLAND_GROUP).fillna(ISLAND_GROUP_DEFAULT)
+
+    # --- Preprocessing Profile Data ---
+    profile_cols = {
+        'birth_year': 'Age', 
+        'avg_monthly_income': 'Income_Status',
+        'avg_monthly_expense': 'Expense_Status',
+        'ewallet_spending': 'Ewallet_Spending_Status',
+        'financial_anxiety_score': 'Anxiety_Score',
+        'financial_literacy_score': 'Literacy_Score',
+        'probability_default': 'Prob_Default',
+        'default_label': 'Default_Label',
+        'cluster': 'Cluster',
+        'FWI_score': 'FWI_Score'
+    }
+    df_profile.rename(columns=profile_cols, inplace=True)
+
+    # Hitung umur (asumsi tahun sekarang 2024)
+    df_profile['Age'] = 2025 - df_profile['Age']
+
+    # Konversi status ke numerik untuk perbandingan
+    status_order = {'Sangat Rendah': 1, 'Rendah': 2, 'Menengah Rendah': 3, 'Menengah': 4, 'Menengah Tinggi': 5, 'Tinggi': 6}
+    df_profile['Income_Status_Num'] = df_profile['Income_Status'].map(status_order)
+    df_profile['Expense_Status_Num'] = df_profile['Expense_Status'].map(status_order)
+    df_profile['Ewallet_Spending_Status_Num'] = df_profile['Ewallet_Spending_Status'].map(status_order)
+
+    # --- Preprocessing Survey Data (Scoring Logic) ---
+    
+    # 1. Bersihkan nama kolom dari spasi yang tidak perlu
+    df_survey.columns = df_survey.columns.str.strip()
+    
+    # PERBAIKAN: Mengganti nama kolom Provinsi_Bersih menjadi province untuk filtering
+    rename_survey_cols = {
+        'Provinsi_Bersih': 'province', # Perbaikan yang diminta
+        'Pendidikan_Standar': 'Pendidikan', 
+        'Perkiraan Pendapatan Bulanan_ID': 'Pendapatan',
+        'Status Tempat Tinggal_ID': 'Status_Tinggal',
+        'Status Pernikahan_ID': 'Status_Nikah',
+        'Jenis Kelamin': 'Gender'
+    }
+    
+    # Logic robust untuk menemukan kolom Pekerjaan
+    job_col_found = False
+    possible_job_cols = ['Jenis Pekerjaan_ID', 'Jenis Pekerjaan', 'Pekerjaan_ID', 'Pekerjaan']
+    
+    for col in possible_job_cols:
+        if col in df_survey.columns:
+            rename_survey_cols[col] = 'Pekerjaan'
+            job_col_found = True
+            break
+        
+    df_survey.rename(columns=rename_survey_cols, inplace=True)
+    
+    # Reverse scoring & skor komposit (lihat analytics.scoring)
+    valid_literasi_cols, valid_perilaku_cols, valid_keputusan_cols, valid_kesejahteraan_cols = score_survey(df_survey)
+    
+    # Cek dan isi kolom Pekerjaan jika tidak ditemukan
+    if 'Pekerjaan' not in df_survey.columns:
+         df_survey['Pekerjaan'] = 'N/A'
+         warnings.warn("Kolom 'Pekerjaan' tidak ditemukan di data Survei. Chart terkait Pekerjaan mungkin menampilkan 'N/A'.", DataWarning)
+
+
+    return df_profile, df_regional, df_survey, valid_literasi_cols, valid_perilaku_cols, valid_keputusan_cols, valid_kesejahteraan_cols
+
+
+def load_frames(data_dir="."):
+    # Bentuk dict dari hasil load_and_preprocess_data, dipakai bundle & dashboard
+    df_profile, df_regional, df_survey, literasi, perilaku, keputusan, kesejahteraan = load_and_preprocess_data(data_dir)
+    # Bobot populasi per responden untuk rata-rata tertimbang (lihat analytics.stats)
+    population = df_regional.groupby('Province')['Population_K'].sum(min_count=1)
+    df_survey[WEIGHT_COL] = population_weights(df_survey['province'], population)
+    frames = {'profile': df_profile, 'regional': df_regional, 'survey': df_survey}
+    score_groups = {'literasi': literasi, 'perilaku': perilaku, 'keputusan': keputusan, 'kesejahteraan': kesejahteraan}
+    return frames, score_groups
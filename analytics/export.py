@@ -0,0 +1,141 @@
+import hashlib
+import os
+import pickle
+import re
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- EKSPOR DATA & AGREGAT (tanpa Streamlit) ---
+# Frame yang sudah ada di memori (frame memory-mapped hasil filter atau agregat yang sudah
+# di-cache) ditulis per potongan baris ke file CSV/Parquet. Memori tambahan hanya sebesar
+# satu potongan, berapa pun jumlah barisnya. File ditulis ke nama sementara lalu di-rename
+# sehingga link unduhan tidak pernah menunjuk file setengah jadi; file besar dipecah menjadi
+# beberapa bagian (part) di bawah batas ukuran file statis server.
+
+EXPORT_FORMATS = {'csv': "CSV", 'parquet': "Parquet"}
+CHUNK_ROWS = 100_000
+MAX_PART_BYTES = 190 * 1024 * 1024  # batas file statis Streamlit 200 MB
+DEFAULT_MAX_AGE = 24 * 3600         # detik; file ekspor lama dihapus
+
+
+def export_slug(*parts):
+    # Nama file deterministik: label yang terbaca + hash kunci (versi data, halaman, filter, ...)
+    label = re.sub(r'[^0-9A-Za-z]+', '-', str(parts[-1])).strip('-').lower()[:40] or 'export'
+    digest = hashlib.sha256(pickle.dumps(parts, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()[:16]
+    return f"{label}-{digest}"
+
+
+def tmp_path(path):
+    # Per proses, agar replika yang berbagi folder ekspor tidak saling menimpa
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def iter_chunks(df, chunk_rows=CHUNK_ROWS):
+    # Irisan posisi (view), tidak menyalin frame memory-mapped
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def part_path(out_dir, slug, fmt, part):
+    suffix = "" if part == 0 else f"-part{part + 1}"
+    return os.path.join(out_dir, f"{slug}{suffix}.{fmt}")
+
+
+def write_csv_parts(df, out_dir, slug, chunk_rows, max_part_bytes, progress):
+    paths, f, part = [], None, 0
+    try:
+        for chunk in iter_chunks(df, chunk_rows):
+            if f is None:
+                path = part_path(out_dir, slug, 'csv', part)
+                f = open(tmp_path(path), 'w', encoding='utf-8', newline='')
+                paths.append(path)
+                chunk.to_csv(f, index=False)  # header di setiap part agar tiap file bisa dibaca sendiri
+            else:
+                chunk.to_csv(f, index=False, header=False)
+            progress(len(chunk))
+            if f.tell() >= max_part_bytes:
+                f.close()
+                f, part = None, part + 1
+        if not paths:
+            path = part_path(out_dir, slug, 'csv', 0)
+            f = open(tmp_path(path), 'w', encoding='utf-8', newline='')
+            paths.append(path)
+            df.to_csv(f, index=False)
+    finally:
+        if f is not None:
+            f.close()
+    return paths
+
+
+def write_parquet_parts(df, out_dir, slug, chunk_rows, max_part_bytes, progress):
+    paths, writer, sink, part = [], None, None, 0
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    try:
+        for chunk in iter_chunks(df, chunk_rows):
+            if writer is None:
+                path = part_path(out_dir, slug, 'parquet', part)
+                sink = pa.OSFile(tmp_path(path), 'wb')
+                writer = pq.ParquetWriter(sink, schema)
+                paths.append(path)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            progress(len(chunk))
+            if sink.tell() >= max_part_bytes:
+                writer.close()
+                sink.close()
+                writer, part = None, part + 1
+        if not paths:
+            path = part_path(out_dir, slug, 'parquet', 0)
+            pq.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False), tmp_path(path))
+            paths.append(path)
+    finally:
+        if writer is not None:
+            writer.close()
+            sink.close()
+    return paths
+
+
+def export_frame(df, out_dir, slug, fmt, chunk_rows=CHUNK_ROWS, max_part_bytes=MAX_PART_BYTES, progress=None):
+    # Mengembalikan daftar path file (satu atau beberapa part). Ekspor yang sama
+    # (slug & format sama) yang sudah ada di disk langsung dipakai ulang.
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format ekspor tidak dikenal: '{fmt}'")
+    os.makedirs(out_dir, exist_ok=True)
+    existing = existing_parts(out_dir, slug, fmt)
+    if existing:
+        return existing
+
+    progress = progress or (lambda rows: None)
+    writer = write_csv_parts if fmt == 'csv' else write_parquet_parts
+    try:
+        paths = writer(df, out_dir, slug, chunk_rows, max_part_bytes, progress)
+    except BaseException:
+        for name in os.listdir(out_dir):
+            if name.startswith(slug) and name.endswith(f".{os.getpid()}.tmp"):
+                os.remove(os.path.join(out_dir, name))
+        raise
+    # Part pertama di-rename paling akhir: jika part pertama ada, semua part sudah lengkap
+    for path in reversed(paths):
+        os.replace(tmp_path(path), path)
+    return paths
+
+
+def existing_parts(out_dir, slug, fmt):
+    paths = []
+    while os.path.exists(part_path(out_dir, slug, fmt, len(paths))):
+        paths.append(part_path(out_dir, slug, fmt, len(paths)))
+    return paths
+
+
+def prune_exports(out_dir, max_age=DEFAULT_MAX_AGE):
+    if not os.path.isdir(out_dir):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
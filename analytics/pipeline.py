@@ -0,0 +1,20 @@
+import warnings
+
+from analytics.aggregates import build_aggregates
+from analytics.data import DataWarning, load_frames
+
+# --- PIPELINE KOMPUTASI ---
+# Titik masuk tunggal: muat + pre-proses + seluruh agregat, tanpa Streamlit. Dipanggil
+# langsung di proses web, oleh CLI `python -m analytics.precompute` (job batch), dan lewat
+# CLI itu sebagai subprocess worker dari dashboard (DASHBOARD_COMPUTE_WORKER=1; lihat
+# build_bundle_in_worker). Hasilnya bisa di-pickle untuk cache bersama lintas replika.
+
+
+def compute_all(data_dir="."):
+    # Peringatan data dikembalikan sebagai teks; pemanggil yang memutuskan cara menampilkannya
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", DataWarning)
+        frames, score_groups = load_frames(data_dir)
+    aggregates = build_aggregates(frames['profile'], frames['regional'], frames['survey'], score_groups)
+    notices = [str(w.message) for w in caught if issubclass(w.category, DataWarning)]
+    return frames, score_groups, aggregates, notices
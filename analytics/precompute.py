@@ -0,0 +1,55 @@
+import argparse
+import logging
+import sys
+import time
+
+from analytics.bundle import source_fingerprint, write_bundle
+from analytics.data import DataFileNotFoundError
+from analytics.pipeline import compute_all
+
+# --- CLI PRECOMPUTE ---
+# Contoh (cron semalam):
+#   python -m analytics.precompute --data-dir /srv/dashboard/data --out /srv/dashboard/bundles
+# Dashboard membaca bundle terbaru lewat env DASHBOARD_BUNDLE_DIR.
+
+logger = logging.getLogger("analytics.precompute")
+
+# Exit code khusus agar pemanggil (worker dashboard) bisa membedakan file sumber yang hilang
+# dari kegagalan lain; pesan error-nya adalah baris terakhir stderr.
+EXIT_DATA_NOT_FOUND = 3
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m analytics.precompute",
+        description="Bangun bundle agregat dashboard (frame pre-proses, cube provinsi, pivot heatmap, ranking regional).",
+    )
+    parser.add_argument("--data-dir", default=".", help="Folder berisi file Excel sumber (default: folder kerja).")
+    parser.add_argument("--out", default="bundles", help="Folder root bundle (default: ./bundles).")
+    parser.add_argument("--keep", type=int, default=5, help="Jumlah versi bundle yang disimpan (default: 5).")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Tampilkan log detail.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    started = time.perf_counter()
+    try:
+        frames, score_groups, aggregates, notices = compute_all(args.data_dir)
+    except DataFileNotFoundError as e:
+        logger.error("%s", e)
+        return EXIT_DATA_NOT_FOUND
+    for notice in notices:
+        logger.warning("%s", notice)
+    logger.info("Data & agregat dihitung dalam %.2fs", time.perf_counter() - started)
+
+    version = write_bundle(args.out, frames, score_groups, aggregates, source_fingerprint(args.data_dir),
+                           notices=notices, keep=args.keep)
+    logger.info("Bundle %s ditulis ke %s (total %.2fs)", version, args.out, time.perf_counter() - started)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import pandas as pd
+
+# --- SCORING SURVEI (tanpa Streamlit) ---
+# Daftar pertanyaan per indeks, reverse scoring, dan skor komposit.
+
+# Kolom kategori
+LITERASI_COLS = [
+    'Mampu Mengidentifikasi Risiko dan Memahami Angka Secara Kompleks', 
+    'Mampu Mengenali Investasi Keuangan yang Baik', 
+    'Mampu Memahami Makna di Balik Angka', 
+    'Mampu Memahami Angka dan Ukuran Keuangan', 
+    'Mampu Memahami Faktor yang Mempengaruhi Arus Kas dan Keuntungan', 
+    'Mampu Memahami Laporan Keuangan dan Indikator Kinerja Utama Perusahaan'
+]
+PERILAKU_COLS = ['Mampu Mengatur dan Membagi Keuangan Sesuai Waktu dan Kebutuhan', 'Mampu Memperkirakan Ketersediaan Uang di Masa Depan', 'Ikut Merencanakan Pengeluaran Rumah Tangga', 'Selalu Berusaha Menabung untuk Hal yang Disukai', 'Menyarankan untuk Menyisihkan Uang untuk Keadaan Darurat', 'Memperhatikan Berita Ekonomi yang Dapat Mempengaruhi Keluarga']
+KEPUTUSAN_COLS = ['Mampu Merencanakan agar Tidak Berbelanja Secara Impulsif', 'Memperhatikan Promosi dan Diskon', 'Berpikir Matang Sebelum Membeli Sesuatu', 'Suka Mencari Tahu Harga Sebelum Membeli', 'Sering Bertindak Tanpa Banyak Pertimbangan', 'Bersifat Impulsif', 'Sering Berbicara Tanpa Pikir Panjang', 'Mampu Menyesuaikan Keputusan Keuangan dengan Perubahan Situasi']
+KESEJAHTERAAN_COLS = ['Menjadi Keuangan Aman', 'Menjamin Keamanan Keuangan di Masa Depan', 'Akan Mencapai Tujuan Keuangan yang Telah Ditetapkan', 'Telah atau Akan Menabung Cukup untuk Hidup di Masa Depan', 'Merasa Tidak Akan Pernah Memiliki Hal yang Diinginkan karena Kondisi Keuangan', 'Tertinggal dalam Urusan Keuangan', 'Keuangan Mengendalikan Hidup Saya', 'Setiap Kali Merasa Mengendalikan Keuangan, Selalu Ada Halangan', 'Tidak Dapat Menikmati Hidup karena Terlalu Terobsesi dengan Uang']
+
+REVERSE_COLS = [
+    'Sering Bertindak Tanpa Banyak Pertimbangan',
+    'Bersifat Impulsif',
+    'Sering Berbicara Tanpa Pikir Panjang',
+    'Merasa Tidak Akan Pernah Memiliki Hal yang Diinginkan karena Kondisi Keuangan',
+    'Tertinggal dalam Urusan Keuangan',
+    'Keuangan Mengendalikan Hidup Saya',
+    'Setiap Kali Merasa Mengendalikan Keuangan, Selalu Ada Halangan',
+    'Tidak Dapat Menikmati Hidup karena Terlalu Terobsesi dengan Uang'
+]
+
+
+def score_survey(df_survey):
+    # Mengubah df_survey in-place: kolom skor -> float, kolom *_R (reverse), dan Skor_* komposit.
+    # Mengembalikan daftar kolom valid per indeks (setelah kolom reverse menggantikan aslinya).
+    all_score_cols_raw = LITERASI_COLS + PERILAKU_COLS + KEPUTUSAN_COLS + KESEJAHTERAAN_COLS
+    
+    # Konversi ke float sebelum reverse scoring
+    for col in all_score_cols_raw:
+        if col in df_survey.columns:
+            df_survey[col] = pd.to_numeric(df_survey[col], errors='coerce').astype(float)
+
+    # Reverse Scoring
+    keputusan_cols = KEPUTUSAN_COLS.copy()
+    kesejahteraan_cols = KESEJAHTERAAN_COLS.copy()
+
+    for col in REVERSE_COLS:
+        if col in df_survey.columns:
+            # Skor dibalik = 6 - Skor (Asumsi skala 1-5)
+            df_survey[f'{col}_R'] = 6 - df_survey[col]
+            
+            # Ganti kolom asli dengan kolom _R di daftar kategori
+            if col in keputusan_cols:
+                keputusan_cols.remove(col)
+                keputusan_cols.append(f'{col}_R')
+            if col in kesejahteraan_cols:
+                kesejahteraan_cols.remove(col)
+                kesejahteraan_cols.append(f'{col}_R')
+
+    # Hitung Skor Komposit
+    valid_literasi_cols = [col for col in LITERASI_COLS if col in df_survey.columns]
+    valid_perilaku_cols = [col for col in PERILAKU_COLS if col in df_survey.columns]
+    valid_keputusan_cols = [col for col in keputusan_cols if col in df_survey.columns]
+    valid_kesejahteraan_cols = [col for col in kesejahteraan_cols if col in df_survey.columns]
+
+    df_survey['Skor_Literasi'] = df_survey[valid_literasi_cols].mean(axis=1)
+    df_survey['Skor_Perilaku'] = df_survey[valid_perilaku_cols].mean(axis=1)
+    df_survey['Skor_Keputusan'] = df_survey[valid_keputusan_cols].mean(axis=1)
+    df_survey['Skor_Kesejahteraan'] = df_survey[valid_kesejahteraan_cols].mean(axis=1)
+
+    return valid_literasi_cols, valid_perilaku_cols, valid_keputusan_cols, valid_kesejahteraan_cols
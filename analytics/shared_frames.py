@@ -0,0 +1,113 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# --- FRAME BERSAMA (MEMORY-MAPPED, READ-ONLY) ---
+# Frame hasil pre-proses disimpan sebagai file Arrow IPC tanpa kompresi lalu dibuka
+# dengan memory map. Semua sesi Streamlit (dan proses worker/replika di host yang sama)
+# membaca buffer yang sama dari page cache OS:
+#   - kolom numerik -> array NumPy read-only yang menunjuk langsung ke buffer mmap
+#   - kolom teks    -> pd.ArrowDtype(string), juga tanpa salinan
+#   - tipe lain (datetime, kategori, nullable) -> disalin kembali ke dtype pandas aslinya
+#   - kolom object bertipe campuran ditolak saat ekspor (TypeError yang jelas)
+# Baris diurutkan per provinsi saat ekspor sehingga filter provinsi cukup berupa
+# irisan posisi (df.iloc[start:stop]) yang tidak menyalin data.
+
+SORT_COLUMN = {'profile': 'province', 'survey': 'province', 'regional': 'Province'}
+META_FILE = "frames.json"
+
+
+def to_arrow_column(series, name):
+    # Mengembalikan (array Arrow, dtype pandas yang perlu dipulihkan saat dibaca atau None)
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iuf':
+        # from_pandas=False: NaN tetap NaN (bukan null) agar bisa dibaca ulang zero-copy
+        return pa.array(series.to_numpy(), from_pandas=False), None
+    if isinstance(dtype, np.dtype) and dtype.kind == 'b':
+        return pa.array(series.to_numpy().astype(np.uint8)), None  # bool Arrow dikemas per bit, tidak bisa zero-copy
+    if dtype == object or isinstance(dtype, pd.StringDtype):
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred not in ('string', 'empty'):
+            raise TypeError(f"Kolom '{name}' berisi nilai bertipe campuran ({inferred}); "
+                            "samakan tipenya saat pre-proses sebelum disimpan ke bundle.")
+        return pa.array(series.astype(object).where(series.notna(), None), type=pa.string()), None
+    # Tipe lain (datetime, kategori, nullable Int64/boolean, ...): konversi bawaan Arrow,
+    # dtype pandas aslinya dicatat agar frame bundle sama dengan frame mode live
+    try:
+        return pa.Array.from_pandas(series), str(dtype)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        raise TypeError(f"Kolom '{name}' dengan dtype {dtype} tidak bisa disimpan ke bundle: {e}") from None
+
+
+def write_arrow_frames(frames, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    meta = {}
+    for name, df in frames.items():
+        sort_col = SORT_COLUMN.get(name)
+        if sort_col in df.columns:
+            df = df.sort_values(sort_col, kind='stable', ignore_index=True)
+            # Rentang baris [start, stop) per provinsi
+            keys = df[sort_col].to_numpy()
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(df) else np.array([], dtype=int)
+            stops = np.r_[starts[1:], len(df)]
+            row_ranges = {str(keys[s]): [int(s), int(e)] for s, e in zip(starts, stops)}
+        else:
+            df = df.reset_index(drop=True)
+            row_ranges = {}
+
+        bool_cols = [str(col) for col in df.columns if isinstance(df[col].dtype, np.dtype) and df[col].dtype.kind == 'b']
+        arrays, dtypes = {}, {}
+        for col in df.columns:
+            arrays[str(col)], dtype = to_arrow_column(df[col], col)
+            if dtype is not None:
+                dtypes[str(col)] = dtype
+        table = pa.table(arrays)
+        with pa.OSFile(os.path.join(out_dir, f"{name}.arrow"), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        meta[name] = {'rows': len(df), 'sort_column': sort_col if row_ranges else None,
+                      'row_ranges': row_ranges, 'bool_columns': bool_cols, 'dtypes': dtypes}
+
+    with open(os.path.join(out_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def from_arrow_column(chunked, as_bool=False, dtype=None):
+    array = chunked.combine_chunks() if chunked.num_chunks != 1 else chunked.chunk(0)
+    if pa.types.is_string(array.type):
+        return pd.arrays.ArrowExtensionArray(array)
+    if dtype is None:
+        values = array.to_numpy(zero_copy_only=True)
+        return values.astype(bool) if as_bool else values
+    # Kolom dengan dtype tercatat (datetime, kategori, nullable): disalin ke dtype pandas aslinya
+    values = array.to_pandas()
+    return values if str(values.dtype) == dtype else values.astype(dtype)
+
+
+def open_arrow_frames(out_dir):
+    # Mengembalikan (frames, row_ranges). Buffer tetap hidup selama DataFrame dipakai.
+    with open(os.path.join(out_dir, META_FILE), encoding='utf-8') as f:
+        meta = json.load(f)
+
+    frames, row_ranges = {}, {}
+    for name, info in meta.items():
+        source = pa.memory_map(os.path.join(out_dir, f"{name}.arrow"), 'r')
+        table = pa.ipc.open_file(source).read_all()
+        bool_cols = set(info.get('bool_columns', []))
+        dtypes = info.get('dtypes', {})
+        columns = {col: from_arrow_column(table.column(col), col in bool_cols, dtypes.get(col)) for col in table.column_names}
+        # copy=False: setiap kolom tetap blok terpisah yang menunjuk ke buffer mmap
+        frames[name] = pd.DataFrame(columns, copy=False)
+        row_ranges[name] = {key: tuple(bounds) for key, bounds in info['row_ranges'].items()}
+    return frames, row_ranges
+
+
+def filter_rows(df, ranges, key, column):
+    # Irisan posisi (view) jika rentang baris tersedia; selain itu mask boolean biasa
+    if ranges:
+        start, stop = ranges.get(key, (0, 0))
+        return df.iloc[start:stop]
+    return df[df[column] == key]
@@ -0,0 +1,109 @@
+import numpy as np
+
+# --- QUANTILE SKETCH (t-digest sederhana berbasis NumPy) ---
+# Ringkasan distribusi berukuran tetap yang bisa digabung (merge): disimpan per sel
+# provinsi x kategori di agregat, lalu kuartil/persentil untuk filter apa pun dihitung
+# dari gabungan sketch sel-selnya -- biaya O(sel), bukan O(baris).
+#
+# Sketch menyimpan centroid (rata-rata, bobot) yang diurutkan. Selama jumlah centroid
+# <= compression, setiap centroid adalah satu nilai unik sehingga hasil kuantil EKSAK
+# (sama dengan interpolasi linear pandas/numpy). Jika lebih, centroid dikelompokkan
+# menurut fungsi skala k1 t-digest: sel di ekor distribusi tetap kecil (ekor akurat),
+# sel di tengah lebih besar; galat peringkat dibatasi kira-kira 1/compression.
+
+DEFAULT_COMPRESSION = 200
+
+
+class QuantileSketch:
+
+    def __init__(self, means, weights, exact, vmin, vmax, compression=DEFAULT_COMPRESSION):
+        self.means = means
+        self.weights = weights
+        self.exact = exact  # True jika centroid berisi satu nilai saja
+        self.min = vmin
+        self.max = vmax
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return cls(np.empty(0), np.empty(0), np.empty(0, dtype=bool), np.nan, np.nan, compression)
+        means, weights = np.unique(values, return_counts=True)
+        sketch = cls(means, weights.astype(float), np.ones(means.size, dtype=bool), means[0], means[-1], compression)
+        return sketch.compress()
+
+    @classmethod
+    def merge_all(cls, sketches):
+        sketches = [s for s in sketches if s.count]
+        if not sketches:
+            return cls.from_values([])
+        means = np.concatenate([s.means for s in sketches])
+        weights = np.concatenate([s.weights for s in sketches])
+        exact = np.concatenate([s.exact for s in sketches])
+
+        # Centroid eksak dengan nilai sama digabung lebih dulu agar data diskret tetap eksak
+        exact_values, inverse = np.unique(means[exact], return_inverse=True)
+        exact_weights = np.bincount(inverse, weights=weights[exact], minlength=exact_values.size)
+        means = np.concatenate([exact_values, means[~exact]])
+        weights = np.concatenate([exact_weights, weights[~exact]])
+        exact = np.concatenate([np.ones(exact_values.size, dtype=bool), np.zeros((~exact).sum(), dtype=bool)])
+
+        order = np.argsort(means, kind='stable')
+        merged = cls(means[order], weights[order], exact[order],
+                     min(s.min for s in sketches), max(s.max for s in sketches),
+                     max(s.compression for s in sketches))
+        return merged.compress()
+
+    def merge(self, other):
+        return QuantileSketch.merge_all([self, other])
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def compress(self):
+        if self.means.size <= self.compression:
+            return self
+        total = self.weights.sum()
+        q_mid = (np.cumsum(self.weights) - self.weights / 2) / total
+        # Fungsi skala k1: k(q) = delta / (2*pi) * asin(2q - 1); satu cluster per unit k
+        cluster = np.floor(self.compression / (2 * np.pi) * (np.arcsin(2 * q_mid - 1) + np.pi / 2)).astype(int)
+        starts = np.flatnonzero(np.r_[True, cluster[1:] != cluster[:-1]])
+
+        weights = np.add.reduceat(self.weights, starts)
+        means = np.add.reduceat(self.means * self.weights, starts) / weights
+        same_value = np.minimum.reduceat(self.means, starts) == np.maximum.reduceat(self.means, starts)
+        exact = same_value & np.logical_and.reduceat(self.exact, starts)
+        return QuantileSketch(means, weights, exact, self.min, self.max, self.compression)
+
+    def quantile(self, q):
+        # Interpolasi linear pada posisi peringkat 0..n-1 (konvensi yang sama dengan pandas)
+        q = np.asarray(q, dtype=float)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        left = np.cumsum(self.weights) - self.weights
+        last = left + self.weights - 1
+        # Centroid eksak menempati seluruh rentang peringkatnya; centroid campuran di titik tengahnya
+        positions = np.where(self.exact[:, None], np.column_stack([left, last]), ((left + last) / 2)[:, None])
+        values = np.repeat(self.means[:, None], 2, axis=1)
+        positions = np.concatenate([[0.0], positions.ravel(), [self.count - 1]])
+        values = np.concatenate([[self.min], values.ravel(), [self.max]])
+        return np.interp(q * (self.count - 1), positions, values)
+
+    def box_stats(self):
+        # Statistik box plot gaya Tukey (seperti px.box): whisker di nilai data terjauh yang
+        # masih di dalam pagar 1.5*IQR. Centroid eksak adalah nilai data asli; centroid campuran
+        # (hanya jika sel > compression nilai unik) diwakili rata-ratanya. outliers = jumlah
+        # observasi di luar pagar.
+        q1, median, q3 = self.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        low, high = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        inside = values[(values >= low) & (values <= high)]
+        outside = (self.means < low) | (self.means > high)
+        return {'q1': q1, 'median': median, 'q3': q3,
+                'lowerfence': min(inside.min(), q1) if inside.size else q1,
+                'upperfence': max(inside.max(), q3) if inside.size else q3,
+                'outliers': float(self.weights[outside].sum())}
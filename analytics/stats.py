@@ -0,0 +1,98 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# --- STATISTIK TERTIMBANG & INTERVAL KEPERCAYAAN ---
+# Rata-rata, jumlah responden, dan interval kepercayaan diturunkan dari "sufficient
+# statistics" aditif per sel (n, jumlah, jumlah kuadrat, dan versi tertimbangnya).
+# Statistik ini dihitung dalam SATU groupby vektor, bisa disimpan di agregat, dan
+# digabung antar provinsi cukup dengan dijumlahkan -- tanpa memindai ulang data mentah.
+#
+# Bobot responden = pangsa penduduk provinsi (df_regional.Population_K) dibagi pangsa
+# responden provinsi tersebut, dinormalisasi agar rata-rata bobot = 1. Provinsi dengan
+# responden sedikit tetapi penduduk besar mendapat bobot besar, sehingga ukuran sampel
+# efektif (Kish) mengecil dan interval kepercayaannya melebar.
+
+WEIGHT_COL = 'Bobot_Populasi'
+STAT_FIELDS = ['n', 'sum', 'sumsq', 'w', 'wsum', 'wsumsq', 'w2']
+CONFIDENCE = 0.95
+MIN_RELIABLE_N = 30  # di bawah ini kategori ditandai sebagai sampel kecil
+
+
+def population_weights(provinces, population):
+    # population: Series jumlah penduduk per provinsi (indeks = nama provinsi)
+    counts = provinces.value_counts()
+    pop = population.reindex(counts.index)
+    if pop.isna().all():
+        return np.ones(len(provinces))
+    pop = pop.fillna(pop.mean())  # provinsi tanpa data penduduk diberi rata-rata
+    per_respondent = (pop / pop.sum()) / (counts / counts.sum())
+    return provinces.map(per_respondent).to_numpy(dtype=float)
+
+
+def sufficient_stats(df, by, value_cols, weight_col=WEIGHT_COL):
+    # Kolom hasil: MultiIndex (kolom nilai, field STAT_FIELDS); indeks: kombinasi `by`
+    x = df[value_cols].to_numpy(dtype=float)
+    valid = ~np.isnan(x)
+    x = np.where(valid, x, 0.0)
+    if weight_col in df.columns:
+        w = np.where(valid, df[weight_col].to_numpy(dtype=float)[:, None], 0.0)
+    else:
+        w = valid.astype(float)
+    wx = w * x
+    parts = {'n': valid.astype(float), 'sum': x, 'sumsq': x * x, 'w': w, 'wsum': wx, 'wsumsq': wx * x, 'w2': w * w}
+
+    columns = pd.MultiIndex.from_product([STAT_FIELDS, value_cols])
+    data = pd.DataFrame(np.concatenate([parts[field] for field in STAT_FIELDS], axis=1), columns=columns, index=df.index)
+    stats = data.groupby([df[col] for col in by], sort=True, observed=True).sum()
+    return stats.swaplevel(axis=1)[value_cols]
+
+
+def collapse(stats, keep):
+    # Gabungkan sel (mis. seluruh provinsi) dengan menjumlahkan statistik aditifnya
+    return stats.groupby(level=keep, sort=True, observed=True).sum()
+
+
+def t_quantile(p, dof):
+    # Kuantil distribusi t tanpa scipy: eksak untuk dof 1-2, ekspansi Cornish-Fisher
+    # untuk dof >= 3 (galat < 0.03 di dof 3, makin kecil untuk dof besar)
+    dof = np.asarray(dof, dtype=float)
+    z = NormalDist().inv_cdf(p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        approx = (z + (z**3 + z) / (4 * dof) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * dof**2)
+                  + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * dof**3))
+        exact_1 = np.tan(np.pi * (p - 0.5))
+        exact_2 = (2 * p - 1) / np.sqrt(2 * p * (1 - p))
+    return np.where(dof < 1, np.nan, np.where(dof < 2, exact_1, np.where(dof < 3, exact_2, approx)))
+
+
+def summarize(stats, weighted=True, confidence=CONFIDENCE):
+    # Kolom hasil: MultiIndex (field, kolom nilai) dengan field n, n_eff, mean, se, ci_low, ci_high.
+    # summary['mean'] langsung berbentuk pivot kategori x kolom nilai.
+    def field(name):
+        return stats.xs(name, axis=1, level=1)
+
+    n = field('n')
+    if weighted:
+        total_w = field('w')
+        mean = field('wsum') / total_w
+        n_eff = total_w**2 / field('w2')
+        # Varians tertimbang (reliability weights), dikoreksi n_eff / (n_eff - 1)
+        var = (field('wsumsq') / total_w - mean**2).clip(lower=0) * n_eff / (n_eff - 1)
+    else:
+        mean = field('sum') / n
+        n_eff = n
+        var = (field('sumsq') - n * mean**2).clip(lower=0) / (n - 1)
+
+    var = var.where(n_eff > 1)
+    se = np.sqrt(var / n_eff)
+    half_width = se * t_quantile(0.5 + confidence / 2, (n_eff - 1).to_numpy())
+    summary = {'n': n, 'n_eff': n_eff, 'mean': mean, 'se': se, 'ci_low': mean - half_width, 'ci_high': mean + half_width}
+    return pd.concat(summary, axis=1).replace([np.inf, -np.inf], np.nan)
+
+
+def summary_table(stats, value_col, weighted=True, confidence=CONFIDENCE):
+    # Satu kolom nilai dalam bentuk datar (untuk bar chart): kategori + n, mean, ci_low, ci_high, ...
+    summary = summarize(stats[[value_col]], weighted, confidence)
+    return summary.xs(value_col, axis=1, level=1).reset_index()
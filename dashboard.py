@@ -1,10 +1,28 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
 import streamlit as st
 import pandas as pd
 import numpy as np
-import altair as alt
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from string import Template
+
+from analytics.aggregates import ALL_PROVINCES, merge_sketch_cells, province_slice
+from analytics.bundle import BUNDLE_FORMAT, latest_version, read_bundle, source_fingerprint
+from analytics.cache import backend_from_url, cache_key, memoize
+from analytics.data import DataFileNotFoundError
+from analytics.export import EXPORT_FORMATS, existing_parts, export_frame, export_slug, prune_exports
+from analytics.pipeline import compute_all
+from analytics.precompute import EXIT_DATA_NOT_FOUND
+from analytics.shared_frames import filter_rows
+from analytics.sketch import QuantileSketch
+from analytics.stats import CONFIDENCE, MIN_RELIABLE_N, sufficient_stats, summarize, summary_table
+
+# Library chart (altair, plotly) diimpor di dalam fungsi halaman: setiap halaman
+# hanya membayar waktu impor library yang benar-benar dirender.
 
 # --- 0. PALET WARNA GLOBAL ---
 COLOR_PRIMARY = '#0077B6'     # Biru Tua (Finansial, Positif)
@@ -13,6 +31,35 @@ COLOR_RISK = '#E63946'        # Merah (Risiko, Default)
 COLOR_WARNING = '#F7B731'     # Kuning/Oranye (Peringatan, Netral)
 COLOR_LITERACY = '#38A3A5'    # Hijau/Aqua (Skor Kinerja/Literasi)
 
+# Label tampilan untuk setiap level hierarki regional (lihat analytics.data.REGION_HIERARCHY)
+REGION_LEVEL_LABELS = {'Island_Group': 'Kelompok Pulau', 'Province': 'Provinsi', 'Regency': 'Kabupaten/Kota'}
+
+# Folder bundle hasil `python -m analytics.precompute`. Jika belum ada bundle dengan
+# BUNDLE_FORMAT yang sama (mis. tepat setelah deploy yang menaikkan format),
+# agregat yang sama dihitung saat request.
+BUNDLE_DIR = os.environ.get("DASHBOARD_BUNDLE_DIR", "bundles")
+
+# DASHBOARD_COMPUTE_WORKER=1: jika belum ada bundle, komputasi dijalankan di proses
+# worker terpisah (CLI precompute) lalu hasilnya dibaca sebagai bundle, sehingga proses
+# web tidak pernah memuat Excel mentah maupun memori sementara pre-proses.
+COMPUTE_IN_WORKER = os.environ.get("DASHBOARD_COMPUTE_WORKER") == "1"
+COMPUTE_WORKER_TIMEOUT = float(os.environ.get("DASHBOARD_COMPUTE_TIMEOUT", 600))  # detik
+
+# URL cache bersama lintas replika (file://, sqlite://, redis://; lihat analytics.cache).
+# Kosong = hanya cache per proses dari st.cache_data.
+SHARED_CACHE_URL = os.environ.get("DASHBOARD_SHARED_CACHE", "")
+
+# Jumlah thread untuk membangun agregasi & figure chart secara paralel
+RENDER_WORKERS = 8
+
+# Hasil ekspor ditulis di bawah static/ agar langsung disajikan server (server.enableStaticServing)
+# di URL app/static/exports/ -- unduhan di-stream oleh server web, bukan lewat sesi Streamlit.
+EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "exports")
+EXPORT_URL = "app/static/exports"
+EXPORT_WORKERS = 2
+EXPORT_POLL_SECONDS = 1.0
+EXPORT_JOB_TTL = 600  # detik; job gagal disimpan selama ini agar pesan error-nya terlihat
+
 # --- 1. KONFIGURASI APLIKASI STREAMLIT ---
 st.set_page_config(
     page_title="Dashboard Analisis Keuangan",
@@ -22,259 +69,346 @@ st.set_page_config(
 
 # --- 2. MUAT DAN PRE-PROSES DATA ---
 
-@st.cache_data
-def load_and_preprocess_data():
-    # Menggunakan nama file lengkap yang terdeteksi dari unggahan pengguna
-    try:
-        df_profile = pd.read_excel("profile_merged.xlsx", sheet_name=0)
-    except FileNotFoundError:
-        st.error("File 'profile_merged.xlsx - Sheet1.csv' tidak ditemukan. Pastikan file Excel tersedia.")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), [], [], [], []
-    
+def build_bundle_in_worker():
+    # Proses terpisah hanya mengimpor paket analytics (bebas Streamlit). Subprocess dipakai,
+    # bukan multiprocessing, karena Streamlit mendaftarkan skrip ini sebagai __main__
+    # sehingga worker spawn/forkserver akan menjalankan ulang dashboard.
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [app_dir, os.environ.get("PYTHONPATH")])))
     try:
-        df_regional = pd.read_excel("regional_filled_fix.xlsx", sheet_name=0)
-    except FileNotFoundError:
-        st.error("File 'regional_filled_fix.xlsx - Sheet1.csv' tidak ditemukan. Pastikan file Excel tersedia.")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), [], [], [], []
-        
-    try:
-        df_survey = pd.read_excel("survey_clean.xlsx", sheet_name=0)
-    except FileNotFoundError:
-        st.error("File 'survey_clean.xlsx - Sheet1.csv' tidak ditemukan. Pastikan file Excel tersedia.")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), [], [], [], []
-
-
-    # --- Preprocessing Regional Data ---
-    regional_cols = {
-        'Provinsi': 'Province',
-        'Jumlah Dana yang Diberikan (Rp miliar)': 'Dana_Diberikan_M',
-        'Outstanding Pinjaman (Rp miliar)': 'Outstanding_Pinjaman_M',
-        'Jumlah Rekening Pemberi Pinjaman (akun)': 'Lender_Accounts',
-        'Jumlah Rekening Penerima Pinjaman Aktif (entitas)': 'Borrower_Active_Entities',
-        'TWP 90%': 'TWP_90',
-        'Jumlah Penduduk (Ribu)': 'Population_K',
-        'Pinjaman_per_Kapita': 'Loan_Per_Capita',
-        'Efisiensi_P2P': 'P2P_Efficiency'
-    }
-    df_regional.rename(columns=regional_cols, inplace=True)
-
-    # Menambahkan kelompok pulau (Jawa vs Non-Jawa)
-    jawa_provinces = ['DKI Jakarta', 'Jawa Barat', 'Jawa Tengah', 'Jawa Timur', 'Banten', 'DI Yogyakarta']
-    df_regional['Island_Group'] = df_regional['Province'].apply(lambda x: 'Jawa' if x in jawa_provinces else 'Non-Jawa')
-
-    # --- Preprocessing Profile Data ---
-    profile_cols = {
-        'birth_year': 'Age', 
-        'avg_monthly_income': 'Income_Status',
-        'avg_monthly_expense': 'Expense_Status',
-        'ewallet_spending': 'Ewallet_Spending_Status',
-        'financial_anxiety_score': 'Anxiety_Score',
-        'financial_literacy_score': 'Literacy_Score',
-        'probability_default': 'Prob_Default',
-        'default_label': 'Default_Label',
-        'cluster': 'Cluster',
-        'FWI_score': 'FWI_Score'
-    }
-    df_profile.rename(columns=profile_cols, inplace=True)
-
-    # Hitung umur (asumsi tahun sekarang 2024)
-    df_profile['Age'] = 2025 - df_profile['Age']
-
-    # Konversi status ke numerik untuk perbandingan
-    status_order = {'Sangat Rendah': 1, 'Rendah': 2, 'Menengah Rendah': 3, 'Menengah': 4, 'Menengah Tinggi': 5, 'Tinggi': 6}
-    df_profile['Income_Status_Num'] = df_profile['Income_Status'].map(status_order)
-    df_profile['Expense_Status_Num'] = df_profile['Expense_Status'].map(status_order)
-    df_profile['Ewallet_Spending_Status_Num'] = df_profile['Ewallet_Spending_Status'].map(status_order)
-
-    # --- Preprocessing Survey Data (Scoring Logic) ---
-    
-    # 1. Bersihkan nama kolom dari spasi yang tidak perlu
-    df_survey.columns = df_survey.columns.str.strip()
-    
-    # PERBAIKAN: Mengganti nama kolom Provinsi_Bersih menjadi province untuk filtering
-    rename_survey_cols = {
-        'Provinsi_Bersih': 'province', # Perbaikan yang diminta
-        'Pendidikan_Standar': 'Pendidikan', 
-        'Perkiraan Pendapatan Bulanan_ID': 'Pendapatan',
-        'Status Tempat Tinggal_ID': 'Status_Tinggal',
-        'Status Pernikahan_ID': 'Status_Nikah',
-        'Jenis Kelamin': 'Gender'
-    }
-    
-    # Logic robust untuk menemukan kolom Pekerjaan
-    job_col_found = False
-    possible_job_cols = ['Jenis Pekerjaan_ID', 'Jenis Pekerjaan', 'Pekerjaan_ID', 'Pekerjaan']
-    
-    for col in possible_job_cols:
-        if col in df_survey.columns:
-            rename_survey_cols[col] = 'Pekerjaan'
-            job_col_found = True
-            break
-        
-    df_survey.rename(columns=rename_survey_cols, inplace=True)
-    
-    # Kolom kategori
-    literasi_cols = [
-        'Mampu Mengidentifikasi Risiko dan Memahami Angka Secara Kompleks', 
-        'Mampu Mengenali Investasi Keuangan yang Baik', 
-        'Mampu Memahami Makna di Balik Angka', 
-        'Mampu Memahami Angka dan Ukuran Keuangan', 
-        'Mampu Memahami Faktor yang Mempengaruhi Arus Kas dan Keuntungan', 
-        'Mampu Memahami Laporan Keuangan dan Indikator Kinerja Utama Perusahaan'
-    ]
-    perilaku_cols = ['Mampu Mengatur dan Membagi Keuangan Sesuai Waktu dan Kebutuhan', 'Mampu Memperkirakan Ketersediaan Uang di Masa Depan', 'Ikut Merencanakan Pengeluaran Rumah Tangga', 'Selalu Berusaha Menabung untuk Hal yang Disukai', 'Menyarankan untuk Menyisihkan Uang untuk Keadaan Darurat', 'Memperhatikan Berita Ekonomi yang Dapat Mempengaruhi Keluarga']
-    keputusan_cols_raw = ['Mampu Merencanakan agar Tidak Berbelanja Secara Impulsif', 'Memperhatikan Promosi dan Diskon', 'Berpikir Matang Sebelum Membeli Sesuatu', 'Suka Mencari Tahu Harga Sebelum Membeli', 'Sering Bertindak Tanpa Banyak Pertimbangan', 'Bersifat Impulsif', 'Sering Berbicara Tanpa Pikir Panjang', 'Mampu Menyesuaikan Keputusan Keuangan dengan Perubahan Situasi']
-    kesejahteraan_cols_raw = ['Menjadi Keuangan Aman', 'Menjamin Keamanan Keuangan di Masa Depan', 'Akan Mencapai Tujuan Keuangan yang Telah Ditetapkan', 'Telah atau Akan Menabung Cukup untuk Hidup di Masa Depan', 'Merasa Tidak Akan Pernah Memiliki Hal yang Diinginkan karena Kondisi Keuangan', 'Tertinggal dalam Urusan Keuangan', 'Keuangan Mengendalikan Hidup Saya', 'Setiap Kali Merasa Mengendalikan Keuangan, Selalu Ada Halangan', 'Tidak Dapat Menikmati Hidup karena Terlalu Terobsesi dengan Uang']
-
-    reverse_cols = [
-        'Sering Bertindak Tanpa Banyak Pertimbangan',
-        'Bersifat Impulsif',
-        'Sering Berbicara Tanpa Pikir Panjang',
-        'Merasa Tidak Akan Pernah Memiliki Hal yang Diinginkan karena Kondisi Keuangan',
-        'Tertinggal dalam Urusan Keuangan',
-        'Keuangan Mengendalikan Hidup Saya',
-        'Setiap Kali Merasa Mengendalikan Keuangan, Selalu Ada Halangan',
-        'Tidak Dapat Menikmati Hidup karena Terlalu Terobsesi dengan Uang'
-    ]
-
-    all_score_cols_raw = literasi_cols + perilaku_cols + keputusan_cols_raw + kesejahteraan_cols_raw
-    
-    # Konversi ke float sebelum reverse scoring
-    for col in all_score_cols_raw:
-        if col in df_survey.columns:
-            df_survey[col] = pd.to_numeric(df_survey[col], errors='coerce').astype(float)
-
-    # Reverse Scoring
-    keputusan_cols = keputusan_cols_raw.copy()
-    kesejahteraan_cols = kesejahteraan_cols_raw.copy()
-
-    for col in reverse_cols:
-        if col in df_survey.columns:
-            # Skor dibalik = 6 - Skor (Asumsi skala 1-5)
-            df_survey[f'{col}_R'] = 6 - df_survey[col]
-            
-            # Ganti kolom asli dengan kolom _R di daftar kategori
-            if col in keputusan_cols:
-                keputusan_cols.remove(col)
-                keputusan_cols.append(f'{col}_R')
-            if col in kesejahteraan_cols:
-                kesejahteraan_cols.remove(col)
-                kesejahteraan_cols.append(f'{col}_R')
-
-    # Hitung Skor Komposit
-    valid_literasi_cols = [col for col in literasi_cols if col in df_survey.columns]
-    valid_perilaku_cols = [col for col in perilaku_cols if col in df_survey.columns]
-    valid_keputusan_cols = [col for col in keputusan_cols if col in df_survey.columns]
-    valid_kesejahteraan_cols = [col for col in kesejahteraan_cols if col in df_survey.columns]
-
-    df_survey['Skor_Literasi'] = df_survey[valid_literasi_cols].mean(axis=1)
-    df_survey['Skor_Perilaku'] = df_survey[valid_perilaku_cols].mean(axis=1)
-    df_survey['Skor_Keputusan'] = df_survey[valid_keputusan_cols].mean(axis=1)
-    df_survey['Skor_Kesejahteraan'] = df_survey[valid_kesejahteraan_cols].mean(axis=1)
-    
-    # Cek dan isi kolom Pekerjaan jika tidak ditemukan
-    if 'Pekerjaan' not in df_survey.columns:
-         df_survey['Pekerjaan'] = 'N/A'
-         st.warning("Kolom 'Pekerjaan' tidak ditemukan di data Survei. Chart terkait Pekerjaan mungkin menampilkan 'N/A'.")
-
-
-    return df_profile, df_regional, df_survey, valid_literasi_cols, valid_perilaku_cols, valid_keputusan_cols, valid_kesejahteraan_cols
+        result = subprocess.run([sys.executable, "-m", "analytics.precompute", "--out", BUNDLE_DIR],
+                                env=env, capture_output=True, text=True, timeout=COMPUTE_WORKER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        # Worker dihentikan; error tidak di-cache sehingga sesi berikutnya mencoba lagi
+        raise RuntimeError(f"Worker komputasi tidak selesai dalam {COMPUTE_WORKER_TIMEOUT} detik.") from None
+
+    # Baris log terakhir worker berisi pesan error-nya ("<waktu> ERROR <pesan>")
+    lines = result.stderr.strip().splitlines()
+    message = lines[-1].split(" ERROR ", 1)[-1] if lines else ""
+    if result.returncode == EXIT_DATA_NOT_FOUND:
+        raise DataFileNotFoundError(message)
+    if result.returncode != 0:
+        raise RuntimeError(f"Worker komputasi gagal (exit code {result.returncode}): {message}")
+    return latest_version(BUNDLE_DIR)
+
+
+@st.cache_resource
+def get_shared_cache():
+    return backend_from_url(SHARED_CACHE_URL)
+
+
+def compute_shared():
+    # Kunci = format agregat + hash isi file sumber: replika mana pun yang pertama menghitung,
+    # hasilnya dipakai semua replika sampai file Excel (atau bentuk agregat) berubah.
+    key = cache_key('compute_all', BUNDLE_FORMAT, source_fingerprint("."))
+    return memoize(get_shared_cache(), key, compute_all)
+
+
+@st.cache_resource(max_entries=1)
+def load_dashboard_data(bundle_version):
+    # Bundle hasil job batch dipakai jika ada: web worker tidak menghitung apa pun.
+    # bundle_version ikut menjadi kunci cache sehingga bundle baru langsung terpakai.
+    # max_entries=1: saat bundle baru terbaca, entri versi lama dilepas (mmap & agregatnya
+    # dibebaskan begitu run yang masih memakainya selesai) sehingga RSS tidak tumbuh per
+    # bundle dan file bundle yang dihapus prune_bundles tidak tertahan di disk.
+    # cache_resource (bukan cache_data): semua sesi memakai objek yang SAMA tanpa
+    # deserialisasi ulang; frame dari bundle bahkan memory-mapped & read-only, jadi
+    # halaman tidak boleh mengubah frame ini (filter menghasilkan view/salinan baru).
+    if not bundle_version and COMPUTE_IN_WORKER:
+        bundle_version = build_bundle_in_worker()
+
+    if bundle_version:
+        manifest, frames, row_ranges, score_groups, aggregates = read_bundle(BUNDLE_DIR, bundle_version)
+        notices = manifest.get('notices', [])
+        data_version = bundle_version
+    else:
+        if SHARED_CACHE_URL:
+            frames, score_groups, aggregates, notices = compute_shared()
+        else:
+            frames, score_groups, aggregates, notices = compute_all()
+        row_ranges = {}
+        data_version = f"live-{uuid.uuid4().hex[:12]}"  # baru setiap kali data dimuat ulang
+    return frames, row_ranges, score_groups, aggregates, notices, data_version
 
 # Menjalankan fungsi pemuatan data
 try:
-    df_profile, df_regional, df_survey, literasi_cols, perilaku_cols, keputusan_cols, kesejahteraan_cols = load_and_preprocess_data()
+    frames, row_ranges, score_groups, aggregates, notices, data_version = load_dashboard_data(latest_version(BUNDLE_DIR))
+except DataFileNotFoundError as e:
+    st.error(str(e))
+    st.stop()
 except Exception as e:
     st.error(f"Terjadi kesalahan saat memuat atau memproses data: {e}")
     # Menghentikan eksekusi Streamlit jika terjadi kesalahan fatal pada pemuatan data
     st.stop()
 
+for notice in notices:
+    st.warning(notice)
+
+df_profile, df_survey = frames['profile'], frames['survey']
+
 
 # --- 3. FUNGSI CARD KPI ---
-def kpi_card(title, value, unit="", delta=None):
-    # PERBAIKAN UTAMA: Konversi nilai string (value) ke float untuk perbandingan numerik
-    # Menangani koma pada Total Users dengan menghapus koma terlebih dahulu
-    value_clean = str(value).replace(',', '')
-    
-    try:
-        numeric_value = float(value_clean)
-    except ValueError:
-        numeric_value = 0 # Default jika konversi gagal 
-        
-    color = COLOR_PRIMARY
-    icon = "📊"
-    
-    if "Default Rate" in title:
-        # Default Rate: Baik jika nilainya rendah (dibawah 5%)
-        color = COLOR_RISK if numeric_value > 5 else COLOR_LITERACY
-        icon = "🚨"
-    elif "Anxiety Score" in title:
-        # Anxiety Score: Baik jika nilainya rendah
-        color = COLOR_RISK if numeric_value > 3 else COLOR_LITERACY
-        icon = "😟"
-    elif "Literacy Score" in title or "FWI Score" in title:
-        # Literacy/FWI Score: Baik jika nilainya tinggi (di atas 3.5 dari skala 5, atau di atas 70 dari skala 100)
-        threshold = 3.5 if unit == "" else 70 
-        color = COLOR_LITERACY if numeric_value > threshold else COLOR_WARNING
-        icon = "💡"
-    elif "Total Users" in title:
-        icon = "👥"
-        color = COLOR_PRIMARY
-    
-    # Penentuan warna dan ikon untuk Cluster
-    if "Cluster" in title:
-        if "Cluster 0" in title:
-            color = COLOR_LITERACY
-            icon = "✅"
-        elif "Cluster 1" in title:
-            color = COLOR_WARNING
-            icon = "⚠️"
-        elif "Cluster 2" in title:
-            color = COLOR_RISK
-            icon = "🛑"
-        
-    delta_display = ""
-    delta_color = COLOR_PRIMARY
-    if delta:
-        if "Default Rate" in title and delta == "Target < 5%":
-            is_good = numeric_value < 5
-            icon_delta = "▼" if numeric_value > 5 else "▲"
-            delta_color = COLOR_LITERACY if is_good else COLOR_RISK
+
+# Tabel ambang batas KPI (deklaratif). direction:
+#   'lower'  -> baik jika nilai <= threshold (mis. Default Rate, Anxiety)
+#   'higher' -> baik jika nilai > threshold (mis. Literacy, FWI)
+#   None     -> warna tetap (good)
+KPI_RULES = pd.DataFrame([
+    # key,            icon,  direction, threshold, good,           bad
+    ('total_users',   '👥', None,      np.nan,    COLOR_PRIMARY,  COLOR_PRIMARY),
+    ('default_rate',  '🚨', 'lower',   5.0,       COLOR_LITERACY, COLOR_RISK),
+    ('anxiety',       '😟', 'lower',   3.0,       COLOR_LITERACY, COLOR_RISK),
+    ('literacy',      '💡', 'higher',  3.5,       COLOR_LITERACY, COLOR_WARNING),  # skala 1-5
+    ('fwi',           '💡', 'higher',  70.0,      COLOR_LITERACY, COLOR_WARNING),  # skala 0-100
+    ('cluster_0',     '✅', None,      np.nan,    COLOR_LITERACY, COLOR_LITERACY),
+    ('cluster_1',     '⚠️', None,      np.nan,    COLOR_WARNING,  COLOR_WARNING),
+    ('cluster_2',     '🛑', None,      np.nan,    COLOR_RISK,     COLOR_RISK),
+    ('age_median',    '🎂', None,      np.nan,    COLOR_PRIMARY,  COLOR_PRIMARY),
+    ('prob_p50',      '📉', 'lower',   5.0,       COLOR_LITERACY, COLOR_RISK),     # % (selaras Default Rate)
+    ('prob_p90',      '🚨', 'lower',   20.0,      COLOR_LITERACY, COLOR_RISK),     # % ekor risiko
+], columns=['key', 'icon', 'direction', 'threshold', 'good', 'bad']).set_index('key')
+
+
+def classify_kpis(keys, values):
+    # Klasifikasi semua card sekaligus: satu lookup tabel + perbandingan vektor NumPy
+    rules = KPI_RULES.loc[keys]
+    values = np.asarray(values, dtype=float)
+    threshold = rules['threshold'].to_numpy()
+    direction = rules['direction'].to_numpy()
+    is_bad = ((direction == 'lower') & (values > threshold)) | ((direction == 'higher') & (values <= threshold))
+    colors = np.where(is_bad, rules['bad'].to_numpy(), rules['good'].to_numpy())
+    return rules['icon'].to_numpy(), colors, is_bad
+
+
+def kpi_row(cards):
+    # cards: list dict {key, title, value (numerik mentah), fmt, unit, delta}
+    # Seluruh baris KPI dikirim sebagai SATU blok HTML (satu delta websocket per baris)
+    icons, colors, is_bad = classify_kpis([c['key'] for c in cards], [c['value'] for c in cards])
+
+    html_cards = []
+    for card, icon, color, bad in zip(cards, icons, colors, is_bad):
+        value_text = card.get('fmt', '{:.2f}').format(card['value'])
+        delta = card.get('delta')
+        delta_display = ""
+        if delta and KPI_RULES.at[card['key'], 'direction'] is not None:
+            # Delta target: panah & warna mengikuti hasil klasifikasi
+            icon_delta = "▼" if bad else "▲"
+            delta_color = COLOR_RISK if bad else COLOR_LITERACY
             delta_display = f'<span style="color: {delta_color}; font-size: 12px;">{icon_delta} {delta}</span>'
-        else:
+        elif delta:
             delta_display = f'<span style="color: {COLOR_PRIMARY}; font-size: 12px;">{delta}</span>'
-            
-    st.markdown(f"""
-        <div style="
-            padding: 15px; 
-            border-radius: 12px; 
-            text-align: left; 
-            background-color: #FFFFFF; 
-            box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
-            border-left: 5px solid {color};
-        ">
-            <div style="display: flex; justify-content: space-between; align-items: center;">
-                <p style="font-size: 14px; color: #6C757D; margin: 0; font-weight: bold;">{title}</p>
-                <span style="font-size: 20px; color: {color};">{icon}</span>
-            </div>
-            <h3 style="font-size: 32px; color: #343A40; margin-top: 10px; margin-bottom: 5px; font-weight: 700;">{value} {unit}</h3>
-            {delta_display}
+
+        html_cards.append(f"""
+            <div style="
+                padding: 15px; 
+                border-radius: 12px; 
+                text-align: left; 
+                background-color: #FFFFFF; 
+                box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
+                border-left: 5px solid {color};
+            ">
+                <div style="display: flex; justify-content: space-between; align-items: center;">
+                    <p style="font-size: 14px; color: #6C757D; margin: 0; font-weight: bold;">{card['title']}</p>
+                    <span style="font-size: 20px; color: {color};">{icon}</span>
+                </div>
+                <h3 style="font-size: 32px; color: #343A40; margin-top: 10px; margin-bottom: 5px; font-weight: 700;">{value_text} {card.get('unit', '')}</h3>
+                {delta_display}
+            </div>""")
+
+    html_row = f"""
+        <div style="display: grid; grid-template-columns: repeat({len(cards)}, minmax(0, 1fr)); gap: 1rem;">
+            {''.join(html_cards)}
         </div>
-    """, unsafe_allow_html=True)
+    """
+    # Buang baris kosong/indentasi agar Markdown tidak memotong blok HTML menjadi code block
+    st.markdown("\n".join(line.strip() for line in html_row.splitlines() if line.strip()), unsafe_allow_html=True)
+
+
+# --- 3b. RENDER CHART PROGRESIF ---
+
+@st.cache_resource
+def get_render_pool():
+    # Satu pool thread dipakai bersama oleh semua sesi; pandas/NumPy melepas GIL
+    # pada sebagian besar agregasi sehingga beberapa chart bisa dibangun bersamaan
+    return ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="chart-builder")
+
+
+def chart_slot():
+    # Placeholder yang langsung terkirim ke browser, diganti chart saat siap
+    slot = st.empty()
+    slot.info("⏳ Memuat chart...")
+    return slot
+
+
+def fill_slot(slot, chart):
+    # Plotly sudah diimpor oleh halaman yang memanggil; objek lain adalah chart Altair
+    import plotly.graph_objects as go
+
+    if isinstance(chart, go.Figure):
+        slot.plotly_chart(chart, use_container_width=True)
+    else:
+        slot.altair_chart(chart, use_container_width=True)
+
+
+def render_progressive(jobs, concurrent=True):
+    # jobs: list (slot, builder). Builder tidak boleh memanggil st.* karena dijalankan
+    # di luar thread skrip; semua penulisan ke slot tetap dilakukan di thread utama.
+    # Konversi Altair -> Vega-Lite (serialisasi data ke Arrow) terjadi di altair_chart pada
+    # thread skrip; karena itu builder hanya meneruskan kolom/agregat yang dipakai chart.
+    if concurrent:
+        pool = get_render_pool()
+        futures = {pool.submit(builder): slot for slot, builder in jobs}
+        results = ((futures[future], future.result) for future in as_completed(futures))
+    else:
+        results = ((slot, builder) for slot, builder in jobs)
+
+    # Penanganan error sama untuk kedua jalur: chart yang gagal tidak menghentikan halaman
+    for slot, result in results:
+        try:
+            fill_slot(slot, result())
+        except Exception as e:
+            slot.error(f"Gagal membangun chart: {e}")
+
+
+# --- 3c. ASET STATIS (CSS GLOBAL) ---
+
+@st.cache_resource
+def load_global_css():
+    # CSS lokal di static/css; placeholder warna ($COLOR_PRIMARY) diisi dari palet global
+    with open("static/css/dashboard.css", encoding="utf-8") as f:
+        css = Template(f.read()).safe_substitute(COLOR_PRIMARY=COLOR_PRIMARY)
+    return f"<style>\n{css}\n</style>"
+
+
+# --- 3d. EKSPOR DATA & AGREGAT ---
+
+@st.cache_resource
+def get_export_pool():
+    # Pool terpisah dari pool render: ekspor besar tidak menahan pengisian chart
+    return ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+
+
+@st.cache_resource
+def get_export_jobs():
+    # Dipakai bersama semua sesi: ekspor yang sama (slug & format) hanya ditulis sekali.
+    # Hanya berisi job yang masih berjalan atau baru gagal; hasil yang selesai dibaca dari disk.
+    return {'lock': threading.Lock(), 'jobs': {}}
+
+
+def prune_export_jobs(jobs):
+    # Job sukses tidak perlu disimpan (file di disk adalah sumber kebenaran); job gagal
+    # disimpan sebentar agar panel sempat menampilkan pesan error-nya
+    now = time.time()
+    for key, job in list(jobs.items()):
+        future = job['future']
+        if future.done() and (future.exception() is None or now - (job['finished_at'] or now) > EXPORT_JOB_TTL):
+            del jobs[key]
+
+
+def submit_export(slug, fmt, df):
+    registry = get_export_jobs()
+    with registry['lock']:
+        jobs = registry['jobs']
+        prune_export_jobs(jobs)
+        job = jobs.get((slug, fmt))
+        if job is not None and not job['future'].done():
+            return job
+        # Belum ada, gagal, atau selesai tetapi filenya sudah dihapus (prune_exports / replika
+        # lain): tulis ulang. export_frame langsung memakai file yang ternyata masih ada.
+        job = {'rows_done': 0, 'total': len(df), 'finished_at': None}
+
+        def progress(rows):
+            job['rows_done'] += rows
+
+        def finished(future):
+            job['finished_at'] = time.time()
+
+        prune_exports(EXPORT_DIR)
+        job['future'] = get_export_pool().submit(export_frame, df, EXPORT_DIR, slug, fmt, progress=progress)
+        job['future'].add_done_callback(finished)
+        jobs[(slug, fmt)] = job
+        return job
+
+
+def export_links(paths):
+    links = []
+    for path in paths:
+        name = os.path.basename(path)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        links.append(f'<a href="{EXPORT_URL}/{name}" download="{name}">⬇️ {name}</a> ({size_mb:,.1f} MB)')
+    st.markdown("<br>".join(links), unsafe_allow_html=True)
+
+
+@st.fragment
+def export_panel(page_key, data_version, filters, exports):
+    # Fragment: interaksi di panel ini hanya menjalankan ulang panel, bukan seluruh halaman.
+    # exports: {label: DataFrame} berisi frame terfilter & agregat chart yang SUDAH dihitung
+    # oleh run halaman terakhir; ekspor tidak pernah menghitung ulang halaman.
+    with st.expander("📥 Ekspor Data & Agregat"):
+        col_item, col_format = st.columns([3, 1])
+        with col_item:
+            label = st.selectbox("Data", list(exports), key=f"{page_key}_export_item")
+        with col_format:
+            fmt = st.radio("Format", list(EXPORT_FORMATS), format_func=EXPORT_FORMATS.get,
+                           horizontal=True, key=f"{page_key}_export_format")
+        df = exports[label]
+        slug = export_slug(data_version, page_key, filters, label)
+
+        paths = existing_parts(EXPORT_DIR, slug, fmt)
+        if paths:
+            export_links(paths)
+            return
+
+        job = get_export_jobs()['jobs'].get((slug, fmt))
+        if job is not None and job['future'].done():
+            if job['future'].exception() is not None:
+                st.error(f"Ekspor gagal: {job['future'].exception()}")
+            else:
+                # Selesai sejak pengecekan di atas, atau file sudah dihapus (prune / replika lain)
+                paths = existing_parts(EXPORT_DIR, slug, fmt)
+                if paths:
+                    export_links(paths)
+                    return
+            job = None  # kembali ke tombol agar ekspor bisa disiapkan ulang
+        if job is None:
+            st.caption(f"{len(df):,} baris × {len(df.columns)} kolom")
+            if st.button("Siapkan File", key=f"{page_key}_export_submit"):
+                job = submit_export(slug, fmt, df)
+        if job is not None:
+            export_progress(slug, fmt)
+
+
+@st.fragment(run_every=EXPORT_POLL_SECONDS)
+def export_progress(slug, fmt):
+    # Hanya dirender selama job berjalan: browser menjalankan ulang fragment ini setiap
+    # EXPORT_POLL_SECONDS tanpa menahan run halaman. File ditulis per potongan di thread pool.
+    job = get_export_jobs()['jobs'].get((slug, fmt))
+    if job is None or job['future'].done():
+        # Selesai (atau job sudah dibersihkan): run penuh merender panel dalam keadaan akhir
+        # (tautan unduhan atau pesan error), sehingga fragment ini berhenti memantau
+        st.rerun()
+    done = job['rows_done'] / job['total'] if job['total'] else 1.0
+    st.progress(min(done, 1.0), text=f"Menulis {job['rows_done']:,} / {job['total']:,} baris...")
 
 
 # --- 4. HALAMAN REGIONAL ---
 
-def page_regional(df):
+def page_regional(rollups, rankings):
+    import altair as alt
+    import plotly.express as px
+
     st.title("🗺️ Analisis Regional ")
     st.write("Analisis distribusi dana dan risiko pinjaman berdasarkan provinsi dan kelompok pulau.")
 
+    df_island = rollups['Island_Group']
+    df_province = rollups['Province']
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.subheader("Distribusi Dana Diberikan (Rp Miliar)")
-        df_dana = df.groupby('Island_Group')['Dana_Diberikan_M'].sum().reset_index()
         fig_dana = px.pie(
-            df_dana,
+            df_island,
             values='Dana_Diberikan_M',
             names='Island_Group',
             title='Dana Diberikan',
@@ -289,9 +423,8 @@ def page_regional(df):
 
     with col2:
         st.subheader("Proporsi Outstanding Pinjaman (Rp Miliar)")
-        df_outstanding = df.groupby('Island_Group')['Outstanding_Pinjaman_M'].sum().reset_index()
         fig_outstanding = px.pie(
-            df_outstanding,
+            df_island,
             values='Outstanding_Pinjaman_M',
             names='Island_Group',
             title='Outstanding Pinjaman',
@@ -307,7 +440,7 @@ def page_regional(df):
     st.markdown("---")
 
     st.subheader("Dana Diberikan vs Outstanding Pinjaman (Rp Miliar) per Provinsi")
-    df_stack = df.melt(
+    df_stack = df_province.melt(
         id_vars='Province', 
         value_vars=['Dana_Diberikan_M', 'Outstanding_Pinjaman_M'], 
         var_name='Tipe_Dana', 
@@ -315,7 +448,7 @@ def page_regional(df):
     ).sort_values(by='Nilai_M', ascending=False)
     
     # Sort the provinces by the total value for better visualization
-    province_order = df_stack.groupby('Province')['Nilai_M'].sum().sort_values(ascending=False).index.tolist()
+    province_order = (df_province['Dana_Diberikan_M'] + df_province['Outstanding_Pinjaman_M']).set_axis(df_province['Province']).sort_values(ascending=False).index.tolist()
 
     chart_stack = alt.Chart(df_stack).mark_bar().encode(
         x=alt.X('Province', sort=province_order, title="Provinsi"),
@@ -337,14 +470,10 @@ def page_regional(df):
     with col3:
         st.subheader("TOP 10 Rasio Lender-Borrower ")
         
-        # 1. Hitung Rasio Lender/Borrower (Lender Accounts / Borrower Active Entities)
-        # Menambahkan epsilon untuk menghindari pembagian dengan nol
-        df['Lender_Borrower_Ratio'] = df['Lender_Accounts'] / (df['Borrower_Active_Entities'] + 1e-6)
+        # Ranking Rasio Lender/Borrower sudah dimaterialisasi dari rollup level provinsi
+        df_top_ratio = rankings['Lender_Borrower_Ratio']
         
-        # 2. Ambil 10 Provinsi Teratas
-        df_top_ratio = df.sort_values('Lender_Borrower_Ratio', ascending=False).head(10)
-        
-        # 3. Visualisasi Bar Chart Horizontal
+        # Visualisasi Bar Chart Horizontal
         chart_ratio = alt.Chart(df_top_ratio).mark_bar().encode(
             x=alt.X('Lender_Borrower_Ratio', title="Rasio Lender-Borrower"),
             y=alt.Y('Province', sort='-x', title="Provinsi"),
@@ -359,7 +488,7 @@ def page_regional(df):
     with col4:
         st.subheader("TWP 90% Tertinggi (Risiko Kredit)")
         # TWP 90%
-        df_top_twp = df.sort_values('TWP_90', ascending=False).head(10)
+        df_top_twp = rankings['TWP_90']
         chart_twp = alt.Chart(df_top_twp).mark_bar().encode(
             x=alt.X('TWP_90', title="TWP 90% (Default Rate)"),
             y=alt.Y('Province', sort='-x', title="Provinsi"),
@@ -370,19 +499,88 @@ def page_regional(df):
         ).interactive().configure_text(font='Poppins') # Menambahkan Poppins di Altair
         st.altair_chart(chart_twp, use_container_width=True)
 
+    st.markdown("---")
+    df_drill, drill_label = page_regional_drilldown(rollups)
+
+    st.markdown("---")
+    exports = {f"Rollup per {REGION_LEVEL_LABELS.get(level, level)}": df for level, df in rollups.items()}
+    exports.update({f"Top 10 {col}": df for col, df in rankings.items()})
+    exports[f"Drill-down {drill_label}"] = df_drill
+    export_panel('regional', data_version, (), exports)
+
+
+def page_regional_drilldown(rollups):
+    import altair as alt
+
+    # Drill-down hierarki: setiap pilihan turun satu level, data diambil dari rollup
+    # yang sudah dimaterialisasi (tidak ada groupby ke tabel dasar)
+    st.subheader("🔎 Drill-down Hierarki Regional")
+
+    metric_labels = {
+        'Dana_Diberikan_M': 'Dana Diberikan (Rp Miliar)',
+        'Outstanding_Pinjaman_M': 'Outstanding Pinjaman (Rp Miliar)',
+        'Lender_Borrower_Ratio': 'Rasio Lender-Borrower',
+        'TWP_90': 'TWP 90% (tertimbang outstanding)',
+        'Population_K': 'Jumlah Penduduk (Ribu)',
+    }
+    levels = list(rollups.keys())[::-1]  # urut dari level paling kasar
+    metric = st.selectbox("Metrik", list(metric_labels), format_func=metric_labels.get, key="regional_drill_metric")
+
+    # Tentukan path: berhenti di level pertama yang dipilih 'Semua'
+    path = {}
+    filter_cols = st.columns(max(len(levels) - 1, 1))
+    for i, level in enumerate(levels[:-1]):
+        view = rollups[level]
+        for parent, value in path.items():
+            view = view[view[parent] == value]
+        options = ['Semua'] + sorted(view[level].unique().tolist())
+        with filter_cols[i]:
+            choice = st.selectbox(REGION_LEVEL_LABELS.get(level, level), options, key=f"regional_drill_{level}")
+        if choice == 'Semua':
+            break
+        path[level] = choice
+
+    child_level = levels[len(path)]
+    df_view = rollups[child_level]
+    for parent, value in path.items():
+        df_view = df_view[df_view[parent] == value]
+    df_view = df_view.sort_values(metric, ascending=False)
+
+    breadcrumb = " › ".join(['Indonesia'] + list(path.values()))
+    drill_label = f"{breadcrumb} — per {REGION_LEVEL_LABELS.get(child_level, child_level)}"
+    st.caption(drill_label)
+
+    chart_drill = alt.Chart(df_view).mark_bar().encode(
+        x=alt.X(metric, title=metric_labels[metric]),
+        y=alt.Y(child_level, sort='-x', title=REGION_LEVEL_LABELS.get(child_level, child_level)),
+        color=alt.value(COLOR_PRIMARY),
+        tooltip=[child_level, alt.Tooltip(metric, format=',.3f'), alt.Tooltip('N_Units', title='Jumlah Unit')]
+    ).properties(
+        title=f"{metric_labels[metric]} per {REGION_LEVEL_LABELS.get(child_level, child_level)}"
+    ).interactive().configure_text(font='Poppins')
+    st.altair_chart(chart_drill, use_container_width=True)
+    return df_view, drill_label
+
+
 # --- 5. HALAMAN PROFILE ---
 
-def page_profile(df):
+def page_profile(df, province_ranges, sketches):
+    import altair as alt
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.title("👤 Analisis Profil Pengguna & Fintech")
     st.write("Eksplorasi demografi, perilaku, dan skor keuangan pengguna")
     
     # --- Filter Provinsi (Dipindahkan ke sini) ---
     st.sidebar.subheader("Filter Profil")
-    all_provinces = ['Semua Provinsi'] + sorted(df['province'].unique().tolist())
+    all_provinces = [ALL_PROVINCES] + sorted(df['province'].unique().tolist())
     selected_province = st.sidebar.selectbox("Pilih Provinsi untuk Profil", all_provinces, key="profile_province_filter")
+    progressive = st.sidebar.checkbox("Render Chart Progresif", value=True, key="profile_progressive_render",
+                                      help="Chart diisi satu per satu begitu selesai dibangun, tanpa menunggu seluruh halaman.")
 
-    if selected_province != 'Semua Provinsi':
-        df_filtered = df[df['province'] == selected_province]
+    if selected_province != ALL_PROVINCES:
+        df_filtered = filter_rows(df, province_ranges, selected_province, 'province')
     else:
         df_filtered = df
     st.markdown("---")
@@ -390,250 +588,312 @@ def page_profile(df):
     # --- KPI Cards ---
     st.subheader("Key Performance Indicators")
     
-    if not df_filtered.empty:
-        col_kpi1, col_kpi2, col_kpi3, col_kpi4, col_kpi5 = st.columns(5)
-        
-        total_users = df_filtered.shape[0]
-        default_rate = df_filtered['Default_Label'].mean() * 100
-        mean_anxiety = df_filtered['Anxiety_Score'].mean()
-        mean_literacy = df_filtered['Literacy_Score'].mean()
-        mean_fwi = df_filtered['FWI_Score'].mean()
-
-        with col_kpi1: kpi_card("Total Users", f"{total_users:,}")
-        with col_kpi2: kpi_card("Default Rate", f"{default_rate:.2f}", "%", delta="Target < 5%")
-        with col_kpi3: kpi_card("Avg. Anxiety Score", f"{mean_anxiety:.2f}")
-        with col_kpi4: kpi_card("Avg. Literacy Score", f"{mean_literacy:.2f}")
-        with col_kpi5: kpi_card("Avg. FWI Score", f"{mean_fwi:.2f}")
-
-        st.markdown("---")
+    if df_filtered.empty:
+        st.warning("Tidak ada data untuk provinsi yang dipilih.")
+        return
 
-        # --- Donut Chart (Gender & Investment Type) ---
-        col_chart1, col_chart2 = st.columns(2)
-
-        with col_chart1:
-            st.subheader("Proporsi Gender")
-            gender_data = df_filtered['gender'].value_counts().reset_index()
-            gender_data.columns = ['Gender', 'Count']
-            fig_gender = px.pie(gender_data, values='Count', names='Gender', hole=0.4, 
-                                color_discrete_sequence=[COLOR_PRIMARY, COLOR_SECONDARY],
-                                title='Jumlah Gender', template='plotly_white')
-            fig_gender.update_layout(font=dict(family='Poppins', size=12))
-            st.plotly_chart(fig_gender, use_container_width=True)
-
-        # PERBAIKAN: Investment Type dalam satu tone warna
-        with col_chart2:
-            st.subheader("Proporsi Investment Type")
-            invest_data = df_filtered['investment_type'].value_counts().reset_index()
-            invest_data.columns = ['Investment_Type', 'Count']
-            # Menggunakan skema multi-warna berdasarkan satu tone (PRIMARY)
-            color_seq_single = px.colors.sequential.PuBu[3:] 
-            fig_invest = px.pie(invest_data, values='Count', names='Investment_Type', hole=0.4, 
-                                color_discrete_sequence=color_seq_single,
-                                title='Jumlah Investment Type', template='plotly_white')
-            fig_invest.update_layout(font=dict(family='Poppins', size=12))
-            st.plotly_chart(fig_invest, use_container_width=True)
-            
-        st.markdown("---")
+    total_users = df_filtered.shape[0]
+    default_rate = df_filtered['Default_Label'].mean() * 100
+    mean_anxiety = df_filtered['Anxiety_Score'].mean()
+    mean_literacy = df_filtered['Literacy_Score'].mean()
+    mean_fwi = df_filtered['FWI_Score'].mean()
+
+    kpi_row([
+        {'key': 'total_users', 'title': "Total Users", 'value': total_users, 'fmt': '{:,.0f}'},
+        {'key': 'default_rate', 'title': "Default Rate", 'value': default_rate, 'unit': "%", 'delta': "Target < 5%"},
+        {'key': 'anxiety', 'title': "Avg. Anxiety Score", 'value': mean_anxiety},
+        {'key': 'literacy', 'title': "Avg. Literacy Score", 'value': mean_literacy},
+        {'key': 'fwi', 'title': "Avg. FWI Score", 'value': mean_fwi},
+    ])
+
+    # KPI persentil dari gabungan quantile sketch provinsi x cluster (O(sel), bukan sort O(baris))
+    def percentiles(value_col, qs):
+        cells = sketches.get(('profile', 'Cluster', value_col))
+        sketch = merge_sketch_cells(cells, selected_province, by_category=False) if cells is not None else None
+        if sketch is None:
+            sketch = QuantileSketch.from_values(df_filtered[value_col])
+        return sketch.quantile(qs)
+
+    age_q1, age_median, age_q3 = percentiles('Age', [0.25, 0.5, 0.75])
+    prob_p50, prob_p90 = percentiles('Prob_Default', [0.5, 0.9]) * 100
+    st.write("")
+    kpi_row([
+        {'key': 'age_median', 'title': "Median Usia", 'value': age_median, 'fmt': '{:.0f}', 'unit': "tahun",
+         'delta': f"IQR {age_q1:.0f}–{age_q3:.0f} tahun"},
+        {'key': 'prob_p50', 'title': "Median Prob. Default", 'value': prob_p50, 'fmt': '{:.1f}', 'unit': "%", 'delta': "Target < 5%"},
+        {'key': 'prob_p90', 'title': "P90 Prob. Default", 'value': prob_p90, 'fmt': '{:.1f}', 'unit': "%", 'delta': "Target < 20%"},
+    ])
 
-        # --- Histogram (Age & Probability Default) ---
-        col_hist1, col_hist2 = st.columns(2)
-
-        with col_hist1:
-            st.subheader("Distribusi Usia (Age)")
-            chart_age = alt.Chart(df_filtered).mark_bar().encode(
-                x=alt.X('Age', bin=alt.Bin(maxbins=20), title="Usia"),
-                y=alt.Y('count()', title="Jumlah Pengguna"),
-                tooltip=['Age', 'count()'],
-                color=alt.value(COLOR_PRIMARY)
-            ).properties(title="Histogram Usia").interactive().configure_text(font='Poppins')
-            st.altair_chart(chart_age, use_container_width=True)
-
-        # PERBAIKAN: Distribution Probability plot dalam satu tone warna (RISK)
-        with col_hist2:
-            st.subheader("Distribusi Probability Default")
-            chart_prob = alt.Chart(df_filtered).mark_bar().encode(
-                x=alt.X('Prob_Default', bin=alt.Bin(maxbins=20), title="Probabilitas Default"),
-                y=alt.Y('count()', title="Jumlah Pengguna"),
-                color=alt.value(COLOR_RISK)
-            ).properties(title="Histogram Probabilitas Default").interactive().configure_text(font='Poppins')
-            st.altair_chart(chart_prob, use_container_width=True)
+    st.markdown("---")
 
-        st.markdown("---")
+    # Builder chart: hanya agregasi pandas + konstruksi figure, TANPA pemanggilan st.*
+    # sehingga aman dijalankan di thread pool (lihat render_progressive).
+    def build_gender():
+        gender_data = df_filtered['gender'].value_counts().reset_index()
+        gender_data.columns = ['Gender', 'Count']
+        fig_gender = px.pie(gender_data, values='Count', names='Gender', hole=0.4, 
+                            color_discrete_sequence=[COLOR_PRIMARY, COLOR_SECONDARY],
+                            title='Jumlah Gender', template='plotly_white')
+        fig_gender.update_layout(font=dict(family='Poppins', size=12))
+        return fig_gender
+
+    # PERBAIKAN: Investment Type dalam satu tone warna
+    def build_invest():
+        invest_data = df_filtered['investment_type'].value_counts().reset_index()
+        invest_data.columns = ['Investment_Type', 'Count']
+        # Menggunakan skema multi-warna berdasarkan satu tone (PRIMARY)
+        color_seq_single = px.colors.sequential.PuBu[3:] 
+        fig_invest = px.pie(invest_data, values='Count', names='Investment_Type', hole=0.4, 
+                            color_discrete_sequence=color_seq_single,
+                            title='Jumlah Investment Type', template='plotly_white')
+        fig_invest.update_layout(font=dict(family='Poppins', size=12))
+        return fig_invest
+
+    def build_age():
+        return alt.Chart(df_filtered[['Age']]).mark_bar().encode(
+            x=alt.X('Age', bin=alt.Bin(maxbins=20), title="Usia"),
+            y=alt.Y('count()', title="Jumlah Pengguna"),
+            tooltip=['Age', 'count()'],
+            color=alt.value(COLOR_PRIMARY)
+        ).properties(title="Histogram Usia").interactive().configure_text(font='Poppins')
+
+    # PERBAIKAN: Distribution Probability plot dalam satu tone warna (RISK)
+    def build_prob():
+        return alt.Chart(df_filtered[['Prob_Default']]).mark_bar().encode(
+            x=alt.X('Prob_Default', bin=alt.Bin(maxbins=20), title="Probabilitas Default"),
+            y=alt.Y('count()', title="Jumlah Pengguna"),
+            color=alt.value(COLOR_RISK)
+        ).properties(title="Histogram Probabilitas Default").interactive().configure_text(font='Poppins')
+
+    # PERBAIKAN: Status Pendapatan vs. Pengeluaran (Cluster Bar Chart yang diperbaiki)
+    def build_inc_exp():
+        df_inc_exp = df_filtered.groupby('Income_Status')[['Income_Status_Num', 'Expense_Status_Num']].mean().reset_index()
+        df_inc_exp_melt = df_inc_exp.melt(id_vars='Income_Status', var_name='Metric', value_name='Avg_Status_Num')
         
-        # --- Bar & Column Chart (Income vs Expense & E-Wallet Spending) ---
-        col_inc_exp, col_ewallet = st.columns(2)
+        status_labels = ['Sangat Rendah', 'Rendah', 'Menengah Rendah', 'Menengah', 'Menengah Tinggi', 'Tinggi']
         
-        # PERBAIKAN: Status Pendapatan vs. Pengeluaran (Cluster Bar Chart yang diperbaiki)
-        with col_inc_exp:
-            st.subheader("Rata-Rata Status Pendapatan vs Pengeluaran")
-            df_inc_exp = df_filtered.groupby('Income_Status')[['Income_Status_Num', 'Expense_Status_Num']].mean().reset_index()
-            df_inc_exp_melt = df_inc_exp.melt(id_vars='Income_Status', var_name='Metric', value_name='Avg_Status_Num')
+        # Cluster Bar Chart yang benar-benar berkelompok
+        return alt.Chart(df_inc_exp_melt).mark_bar().encode(
+            # X: Kategori utama (Income Status)
+            x=alt.X('Income_Status:N', title="Status Pendapatan", sort=status_labels),
+            # Y: Nilai (Tinggi bar)
+            y=alt.Y('Avg_Status_Num', title="Rata-Rata Status (1-6)"),
             
-            status_labels = ['Sangat Rendah', 'Rendah', 'Menengah Rendah', 'Menengah', 'Menengah Tinggi', 'Tinggi']
+            # Color: Metric digunakan untuk membedakan Pendapatan vs Pengeluaran
+            color=alt.Color('Metric', scale=alt.Scale(domain=['Income_Status_Num', 'Expense_Status_Num'], range=[COLOR_PRIMARY, COLOR_RISK]), 
+                                                      legend=alt.Legend(title="Metrik Status", labelExpr="datum.label == 'Income_Status_Num' ? 'Pendapatan' : 'Pengeluaran'")),
             
-            # Cluster Bar Chart yang benar-benar berkelompok
-            chart_inc_exp = alt.Chart(df_inc_exp_melt).mark_bar().encode(
-                # X: Kategori utama (Income Status)
-                x=alt.X('Income_Status:N', title="Status Pendapatan", sort=status_labels),
-                # Y: Nilai (Tinggi bar)
-                y=alt.Y('Avg_Status_Num', title="Rata-Rata Status (1-6)"),
-                
-                # Color: Metric digunakan untuk membedakan Pendapatan vs Pengeluaran
-                color=alt.Color('Metric', scale=alt.Scale(domain=['Income_Status_Num', 'Expense_Status_Num'], range=[COLOR_PRIMARY, COLOR_RISK]), 
-                                                          legend=alt.Legend(title="Metrik Status", labelExpr="datum.label == 'Income_Status_Num' ? 'Pendapatan' : 'Pengeluaran'")),
-                
-                # XOffset untuk menggeser bar di dalam band X (Clustering)
-                xOffset=alt.XOffset('Metric', scale=alt.Scale(domain=['Income_Status_Num', 'Expense_Status_Num'])),
-                
-                tooltip=['Income_Status', alt.Tooltip('Metric', title='Metrik Status', format='.2f'), alt.Tooltip('Avg_Status_Num', title='Rata-Rata Status', format='.2f')]
-            ).properties(
-                title="Rata-Rata Status Pengeluaran vs Pendapatan"
-            ).interactive().configure_text(font='Poppins')
-            st.altair_chart(chart_inc_exp, use_container_width=True)
-
-        # 2. Jumlah E-Wallet Spending berdasarkan Status
-        with col_ewallet:
-            st.subheader("Distribusi Jumlah E-Wallet Spending")
-            df_ewallet = df_filtered.groupby('Ewallet_Spending_Status')['Ewallet_Spending_Status'].count().reset_index(name='Count')
+            # XOffset untuk menggeser bar di dalam band X (Clustering)
+            xOffset=alt.XOffset('Metric', scale=alt.Scale(domain=['Income_Status_Num', 'Expense_Status_Num'])),
             
-            chart_ewallet = alt.Chart(df_ewallet).mark_bar().encode(
-                x=alt.X('Ewallet_Spending_Status', title="Status E-Wallet Spending"),
-                y=alt.Y('Count', title="Jumlah Pengguna"),
-                color=alt.value(COLOR_WARNING),
-                tooltip=['Ewallet_Spending_Status', 'Count']
-            ).properties(title="Distribusi E-Wallet Spending").interactive().configure_text(font='Poppins')
-            st.altair_chart(chart_ewallet, use_container_width=True)
-
-        st.markdown("---")
+            tooltip=['Income_Status', alt.Tooltip('Metric', title='Metrik Status', format='.2f'), alt.Tooltip('Avg_Status_Num', title='Rata-Rata Status', format='.2f')]
+        ).properties(
+            title="Rata-Rata Status Pengeluaran vs Pendapatan"
+        ).interactive().configure_text(font='Poppins')
 
-        # --- Stacked Bar Chart (Education vs Employment) ---
-        st.subheader("Proporsi Pendidikan Berdasarkan Status Pekerjaan")
-        chart_stacked = alt.Chart(df_filtered).mark_bar().encode(
+    # 2. Jumlah E-Wallet Spending berdasarkan Status
+    def build_ewallet():
+        df_ewallet = df_filtered.groupby('Ewallet_Spending_Status')['Ewallet_Spending_Status'].count().reset_index(name='Count')
+        
+        return alt.Chart(df_ewallet).mark_bar().encode(
+            x=alt.X('Ewallet_Spending_Status', title="Status E-Wallet Spending"),
+            y=alt.Y('Count', title="Jumlah Pengguna"),
+            color=alt.value(COLOR_WARNING),
+            tooltip=['Ewallet_Spending_Status', 'Count']
+        ).properties(title="Distribusi E-Wallet Spending").interactive().configure_text(font='Poppins')
+
+    def build_stacked():
+        # Jumlah per kombinasi dihitung di builder; chart menerima puluhan baris, bukan seluruh profil
+        df_counts = df_filtered.groupby(['employment_status', 'education_level'], observed=True).size().reset_index(name='Count')
+        return alt.Chart(df_counts).mark_bar().encode(
             x=alt.X('employment_status', title="Status Pekerjaan"),
-            y=alt.Y('count()', stack="normalize", title="Proporsi"),
+            y=alt.Y('sum(Count)', stack="normalize", title="Proporsi"),
             color=alt.Color('education_level', title="Level Pendidikan", scale=alt.Scale(scheme='viridis')), # Menggunakan palet Viridis untuk kontras yang baik
-            tooltip=['employment_status', 'education_level', alt.Tooltip('count()', title='Jumlah', format=',')]
+            tooltip=['employment_status', 'education_level', alt.Tooltip('Count', title='Jumlah', format=',')]
         ).properties(title="Proporsi Pendidikan Berdasarkan Status Pekerjaan").interactive().configure_text(font='Poppins')
-        st.altair_chart(chart_stacked, use_container_width=True)
-        
-        st.markdown("---")
 
-        # --- Treemap (Main Fintech App & Loan Usage Purpose) ---
-        col_tree1, col_tree2 = st.columns(2)
-
-        # Treemap Main Fintech App (Satu Tone Biru, dari gelap ke terang)
-        with col_tree1:
-            st.subheader("Distribusi Main Fintech App")
-            df_fintech = df_filtered['main_fintech_app'].value_counts().reset_index()
-            df_fintech.columns = ['Fintech_App', 'Count']
-            fig_fintech_tree = px.treemap(
-                df_fintech,
-                path=['Fintech_App'],
-                values='Count',
-                color='Count',  # Menggunakan Count untuk menentukan warna
-                color_continuous_scale='Blues', # Skema warna sequential Biru
-                title="Main Fintech App",
-                template='plotly_white'
-            )
-            fig_fintech_tree.update_layout(margin=dict(t=50, l=10, r=10, b=10), font=dict(family='Poppins', size=12))
-            st.plotly_chart(fig_fintech_tree, use_container_width=True)
-
-        # Treemap Loan Usage Purpose (Satu Tone Hijau, dari gelap ke terang)
-        with col_tree2:
-            st.subheader("Distribusi Loan Usage Purpose")
-            df_loan = df_filtered['loan_usage_purpose'].value_counts().reset_index()
-            df_loan.columns = ['Purpose', 'Count']
-            fig_loan_tree = px.treemap(
-                df_loan,
-                path=['Purpose'],
-                values='Count',
-                color='Count',  # Menggunakan Count untuk menentukan warna
-                color_continuous_scale='Greens', # Skema warna sequential Hijau
-                title="Loan Usage Purpose",
-                template='plotly_white'
-            )
-            fig_loan_tree.update_layout(margin=dict(t=50, l=10, r=10, b=10), font=dict(family='Poppins', size=12))
-            st.plotly_chart(fig_loan_tree, use_container_width=True)
+    # Treemap Main Fintech App (Satu Tone Biru, dari gelap ke terang)
+    def build_fintech_tree():
+        df_fintech = df_filtered['main_fintech_app'].value_counts().reset_index()
+        df_fintech.columns = ['Fintech_App', 'Count']
+        fig_fintech_tree = px.treemap(
+            df_fintech,
+            path=['Fintech_App'],
+            values='Count',
+            color='Count',  # Menggunakan Count untuk menentukan warna
+            color_continuous_scale='Blues', # Skema warna sequential Biru
+            title="Main Fintech App",
+            template='plotly_white'
+        )
+        fig_fintech_tree.update_layout(margin=dict(t=50, l=10, r=10, b=10), font=dict(family='Poppins', size=12))
+        return fig_fintech_tree
+
+    # Treemap Loan Usage Purpose (Satu Tone Hijau, dari gelap ke terang)
+    def build_loan_tree():
+        df_loan = df_filtered['loan_usage_purpose'].value_counts().reset_index()
+        df_loan.columns = ['Purpose', 'Count']
+        fig_loan_tree = px.treemap(
+            df_loan,
+            path=['Purpose'],
+            values='Count',
+            color='Count',  # Menggunakan Count untuk menentukan warna
+            color_continuous_scale='Greens', # Skema warna sequential Hijau
+            title="Loan Usage Purpose",
+            template='plotly_white'
+        )
+        fig_loan_tree.update_layout(margin=dict(t=50, l=10, r=10, b=10), font=dict(family='Poppins', size=12))
+        return fig_loan_tree
+
+    # FWI Score (Gauge Chart Angular/Speedometer)
+    def build_gauge():
+        fig_gauge = go.Figure(go.Indicator(
+            mode = "gauge+number",
+            value = mean_fwi,
+            title = {'text': "Average FWI Score"},
+            gauge = {
+                'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "darkgray"},
+                'shape': "angular", # Memastikan bentuk semi-circle
+                'bar': {'color': 'rgba(0,0,0,0)'}, # Menghilangkan bar nilai (menggunakan jarum)
+                'steps': [
+                    {'range': [0, 20], 'color': COLOR_RISK},        # Merah
+                    {'range': [20, 40], 'color': '#F4A261'},       # Oranye
+                    {'range': [40, 60], 'color': COLOR_WARNING},     # Kuning
+                    {'range': [60, 80], 'color': '#A7C957'},       # Hijau Muda
+                    {'range': [80, 100], 'color': COLOR_LITERACY}    # Hijau Tua
+                ],
+                'threshold': {
+                    'line': {'color': "black", 'width': 6}, # Jarum penunjuk
+                    'thickness': 0.9,
+                    'value': mean_fwi
+                }
+            }
+        ))
+        fig_gauge.update_layout(height=300, template='plotly_white', margin=dict(t=80, b=40), font=dict(family='Poppins', size=12))
+        return fig_gauge
 
-        st.markdown("---")
+    cluster_counts = df_filtered['Cluster'].value_counts().sort_index()
+
+    def build_cluster_bar():
+        # Bar chart untuk visualisasi cluster
+        df_cluster_counts = cluster_counts.reset_index()
+        df_cluster_counts.columns = ['Cluster', 'Count']
+        
+        return alt.Chart(df_cluster_counts).mark_bar().encode(
+            x=alt.X('Cluster:N', title="Cluster ID"),
+            y=alt.Y('Count', title="Jumlah Pengguna"),
+            color=alt.Color('Cluster:N', scale=alt.Scale(domain=[0, 1, 2], range=[COLOR_LITERACY, COLOR_WARNING, COLOR_RISK]), legend=None),
+            tooltip=['Cluster:N', 'Count']
+        ).properties(title="Jumlah User per Cluster").interactive().configure_text(font='Poppins')
+
+    # --- Layout: semua slot chart dikirim lebih dulu sebagai placeholder ---
+    jobs = []
+
+    # --- Donut Chart (Gender & Investment Type) ---
+    col_chart1, col_chart2 = st.columns(2)
+    with col_chart1:
+        st.subheader("Proporsi Gender")
+        jobs.append((chart_slot(), build_gender))
+    with col_chart2:
+        st.subheader("Proporsi Investment Type")
+        jobs.append((chart_slot(), build_invest))
         
-        # --- Gauge Chart (Average FWI Score) & Cluster KPI ---
-        col_gauge, col_cluster_kpis = st.columns([1, 1])
+    st.markdown("---")
 
-        # FWI Score (Gauge Chart Angular/Speedometer)
-        with col_gauge:
-            st.subheader("Rata-Rata FWI Score (Financial Well-being Index)")
-            
-            fig_gauge = go.Figure(go.Indicator(
-                mode = "gauge+number",
-                value = mean_fwi,
-                title = {'text': "Average FWI Score"},
-                gauge = {
-                    'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "darkgray"},
-                    'shape': "angular", # Memastikan bentuk semi-circle
-                    'bar': {'color': 'rgba(0,0,0,0)'}, # Menghilangkan bar nilai (menggunakan jarum)
-                    'steps': [
-                        {'range': [0, 20], 'color': COLOR_RISK},        # Merah
-                        {'range': [20, 40], 'color': '#F4A261'},       # Oranye
-                        {'range': [40, 60], 'color': COLOR_WARNING},     # Kuning
-                        {'range': [60, 80], 'color': '#A7C957'},       # Hijau Muda
-                        {'range': [80, 100], 'color': COLOR_LITERACY}    # Hijau Tua
-                    ],
-                    'threshold': {
-                        'line': {'color': "black", 'width': 6}, # Jarum penunjuk
-                        'thickness': 0.9,
-                        'value': mean_fwi
-                    }
-                }
-            ))
-            fig_gauge.update_layout(height=300, template='plotly_white', margin=dict(t=80, b=40), font=dict(family='Poppins', size=12))
-            st.plotly_chart(fig_gauge, use_container_width=True)
-
-        # Clusterisasi dalam 3 KPI cards
-        with col_cluster_kpis:
-            st.subheader("Jumlah Users per Cluster")
-            cluster_counts = df_filtered['Cluster'].value_counts().sort_index()
-            
-            # Bar chart untuk visualisasi cluster
-            df_cluster_counts = cluster_counts.reset_index()
-            df_cluster_counts.columns = ['Cluster', 'Count']
-            
-            chart_cluster_bar = alt.Chart(df_cluster_counts).mark_bar().encode(
-                x=alt.X('Cluster:N', title="Cluster ID"),
-                y=alt.Y('Count', title="Jumlah Pengguna"),
-                color=alt.Color('Cluster:N', scale=alt.Scale(domain=[0, 1, 2], range=[COLOR_LITERACY, COLOR_WARNING, COLOR_RISK]), legend=None),
-                tooltip=['Cluster:N', 'Count']
-            ).properties(title="Jumlah User per Cluster").interactive().configure_text(font='Poppins')
-            st.altair_chart(chart_cluster_bar, use_container_width=True)
-
-            # KPI Cards untuk Cluster
-            col_c0, col_c1, col_c2 = st.columns(3)
-            with col_c0:
-                kpi_card("Cluster 0 Mahasiswa yang Stabil Dengan Kecemasan Rendah", f"{cluster_counts.get(0, 0):,}")
-            with col_c1:
-                kpi_card("Cluster 1 Mahasiswa Dengan Kecemasan Finansial Tinggi dan Pengeluaran Menengah", f"{cluster_counts.get(1, 0):,}")
-            with col_c2:
-                kpi_card("Cluster 2 Pelajar Dengan Kecemasan Finansial Sedang & Pola Pengeluaran Stabil", f"{cluster_counts.get(2, 0):,}")
+    # --- Histogram (Age & Probability Default) ---
+    col_hist1, col_hist2 = st.columns(2)
+    with col_hist1:
+        st.subheader("Distribusi Usia (Age)")
+        jobs.append((chart_slot(), build_age))
+    with col_hist2:
+        st.subheader("Distribusi Probability Default")
+        jobs.append((chart_slot(), build_prob))
 
-    else:
-        st.warning("Tidak ada data untuk provinsi yang dipilih.")
+    st.markdown("---")
+    
+    # --- Bar & Column Chart (Income vs Expense & E-Wallet Spending) ---
+    col_inc_exp, col_ewallet = st.columns(2)
+    with col_inc_exp:
+        st.subheader("Rata-Rata Status Pendapatan vs Pengeluaran")
+        jobs.append((chart_slot(), build_inc_exp))
+    with col_ewallet:
+        st.subheader("Distribusi Jumlah E-Wallet Spending")
+        jobs.append((chart_slot(), build_ewallet))
+
+    st.markdown("---")
+
+    # --- Stacked Bar Chart (Education vs Employment) ---
+    st.subheader("Proporsi Pendidikan Berdasarkan Status Pekerjaan")
+    jobs.append((chart_slot(), build_stacked))
+    
+    st.markdown("---")
+
+    # --- Treemap (Main Fintech App & Loan Usage Purpose) ---
+    col_tree1, col_tree2 = st.columns(2)
+    with col_tree1:
+        st.subheader("Distribusi Main Fintech App")
+        jobs.append((chart_slot(), build_fintech_tree))
+    with col_tree2:
+        st.subheader("Distribusi Loan Usage Purpose")
+        jobs.append((chart_slot(), build_loan_tree))
+
+    st.markdown("---")
+    
+    # --- Gauge Chart (Average FWI Score) & Cluster KPI ---
+    col_gauge, col_cluster_kpis = st.columns([1, 1])
+    with col_gauge:
+        st.subheader("Rata-Rata FWI Score (Financial Well-being Index)")
+        jobs.append((chart_slot(), build_gauge))
+
+    # Clusterisasi dalam 3 KPI cards
+    with col_cluster_kpis:
+        st.subheader("Jumlah Users per Cluster")
+        jobs.append((chart_slot(), build_cluster_bar))
+
+        # KPI Cards untuk Cluster
+        kpi_row([
+            {'key': 'cluster_0', 'title': "Cluster 0 Mahasiswa yang Stabil Dengan Kecemasan Rendah", 'value': cluster_counts.get(0, 0), 'fmt': '{:,.0f}'},
+            {'key': 'cluster_1', 'title': "Cluster 1 Mahasiswa Dengan Kecemasan Finansial Tinggi dan Pengeluaran Menengah", 'value': cluster_counts.get(1, 0), 'fmt': '{:,.0f}'},
+            {'key': 'cluster_2', 'title': "Cluster 2 Pelajar Dengan Kecemasan Finansial Sedang & Pola Pengeluaran Stabil", 'value': cluster_counts.get(2, 0), 'fmt': '{:,.0f}'},
+        ])
+
+    # --- Isi setiap slot begitu chart-nya selesai dibangun ---
+    render_progressive(jobs, concurrent=progressive)
+
+    st.markdown("---")
+    export_panel('profile', data_version, (selected_province,), {
+        "Data Profil (terfilter)": df_filtered,
+        "Jumlah User per Cluster": cluster_counts.rename_axis('Cluster').reset_index(name='Count'),
+        "Persentil Usia & Prob. Default": pd.DataFrame({
+            'Metrik': ['Age'] * 3 + ['Prob_Default'] * 2,
+            'Persentil': [25, 50, 75, 50, 90],
+            'Nilai': [age_q1, age_median, age_q3, prob_p50 / 100, prob_p90 / 100],
+        }),
+    })
 
 
 # --- 6. HALAMAN SURVEY ---
 
-def page_survey(df):
+def page_survey(df, province_ranges, aggregates):
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.title("📊 Analisis Skor Komposit Survei Keuangan")
     st.write("Analisis mendalam skor Literasi, Perilaku, Keputusan, dan Kesejahteraan Keuangan berdasarkan demografi.")
     
     # --- Filter Provinsi untuk Survey (Dipindahkan ke sini) ---
     st.sidebar.subheader("Filter Survey")
-    all_provinces = ['Semua Provinsi'] + sorted(df['province'].unique().tolist())
+    all_provinces = [ALL_PROVINCES] + sorted(df['province'].unique().tolist())
     selected_province = st.sidebar.selectbox("Pilih Provinsi untuk Survei", all_provinces, key="survey_province_filter")
+    weighted = st.sidebar.checkbox("Rata-rata Tertimbang Populasi", value=True, key="survey_weighted",
+                                   help="Responden ditimbang dengan jumlah penduduk provinsinya (data regional), "
+                                        "sehingga provinsi dengan responden terlalu sedikit/banyak tidak mendistorsi rata-rata.")
     
-    if selected_province != 'Semua Provinsi':
-        df_filtered = df[df['province'] == selected_province]
+    if selected_province != ALL_PROVINCES:
+        df_filtered = filter_rows(df, province_ranges, selected_province, 'province')
     else:
         df_filtered = df
+    # Frame terfilter + agregat setiap chart (diisi helper chart) untuk panel ekspor
+    chart_exports = {"Data Survei (terfilter)": df_filtered}
         
     st.markdown("---")
     
@@ -654,21 +914,29 @@ def page_survey(df):
 
 
     # Helper function for pivot table and chart creation
-    def create_heatmap_chart(df, category_col, score_cols, title, color_scheme): 
+    def create_heatmap_chart(df, category_col, score_group, title, color_scheme): 
         if category_col not in df.columns or df[category_col].nunique() == 0 or df.empty:
             st.warning(f"Kolom '{category_col}' tidak ditemukan di data Survei atau tidak memiliki data unik.")
             return
-            
-        pivot_df = pd.pivot_table(df, values=score_cols, index=category_col, aggfunc='mean')
+
+        score_cols = score_groups[score_group]
+        # Statistik diambil dari agregat yang sudah dihitung (bundle/cache); hitung langsung hanya jika tidak ada
+        stats = aggregates['heatmap_stats'].get((score_group, category_col))
+        if stats is not None:
+            stats = province_slice(stats, selected_province)
+        if stats is None:
+            stats = sufficient_stats(df, [category_col], score_cols)
+        summary = summarize(stats, weighted)
         
         # Reindex jika kolom kategori memiliki urutan spesifik
         if category_col == 'Pendidikan':
-            pivot_df = pivot_df.reindex(pendidikan_order)
+            summary = summary.reindex(pendidikan_order)
         elif category_col == 'Pendapatan':
-            pivot_df = pivot_df.reindex(pendapatan_order)
+            summary = summary.reindex(pendapatan_order)
         elif category_col == 'Pekerjaan':
             if len(pekerjaan_order) > 1 or pekerjaan_order[0] != 'N/A':
-                 pivot_df = pivot_df.reindex(pekerjaan_order)
+                 summary = summary.reindex(pekerjaan_order)
+        pivot_df = summary['mean']
 
         # Ubah nama kolom agar lebih ringkas
         rename_map = {}
@@ -694,6 +962,12 @@ def page_survey(df):
             zmin=color_min, # Batas bawah skor
             zmax=color_max  # Batas atas skor
         )
+        # Hover: jumlah responden & interval kepercayaan per sel
+        fig.update_traces(
+            customdata=np.dstack([summary[field].T.to_numpy() for field in ('n', 'ci_low', 'ci_high')]),
+            hovertemplate=("%{x}<br>%{y}<br>Rata-rata: %{z:.2f}<br>"
+                           f"CI {CONFIDENCE:.0%}: " "%{customdata[1]:.2f} – %{customdata[2]:.2f}<br>n = %{customdata[0]:.0f}<extra></extra>"),
+        )
         
         # Penyesuaian Layout untuk X-axis dan Y-axis agar tidak tumpang tindih
         fig.update_xaxes(side="top", tickangle=-45)
@@ -712,24 +986,61 @@ def page_survey(df):
             font=dict(family='Poppins', size=12) # Menambahkan Poppins ke Plotly
         )
         st.plotly_chart(fig, use_container_width=True)
+        small_sample_note(summary['n'].min(axis=1))
+        chart_exports[title] = summary.stack(level=1, future_stack=True).rename_axis([category_col, 'Pertanyaan']).reset_index()
+
+    # Penanda sampel kecil: kategori dengan n < MIN_RELIABLE_N punya interval kepercayaan lebar
+    def small_sample_note(n_by_category):
+        small = n_by_category[n_by_category < MIN_RELIABLE_N]
+        if not small.empty:
+            items = ", ".join(f"{' / '.join(map(str, cat)) if isinstance(cat, tuple) else cat} (n={n:.0f})" for cat, n in small.items())
+            st.caption(f"⚠️ Sampel kecil (n < {MIN_RELIABLE_N}), interval kepercayaan lebar: {items}")
 
     # Helper function for Box Plot
+    # Kuartil & pagar dari gabungan quantile sketch provinsi x kategori (tanpa memindai baris)
     def create_boxplot_chart(df, x_col, y_col, title, x_order=None, color=COLOR_PRIMARY):
         if x_col not in df.columns or df[x_col].nunique() == 0 or df.empty:
             st.warning(f"Kolom '{x_col}' tidak ditemukan di data Survei atau tidak memiliki data unik.")
             return
 
-        fig = px.box(
-            df,
-            x=x_col,
-            y=y_col,
-            category_orders={x_col: x_order} if x_order else None,
-            title=title,
-            color_discrete_sequence=[color],
-            template='plotly_white'
-        )
-        fig.update_layout(yaxis_title=y_col, xaxis_title=x_col, font=dict(family='Poppins', size=12))
+        cells = aggregates['quantile_sketches'].get(('survey', x_col, y_col))
+        merged = merge_sketch_cells(cells, selected_province) if cells is not None else None
+        if merged is None:
+            merged = {category: QuantileSketch.from_values(values) for category, values in df.groupby(x_col, sort=True)[y_col]}
+        categories = [c for c in (x_order or []) if c in merged] + [c for c in merged if c not in (x_order or [])]
+        categories = [c for c in categories if merged[c].count]
+        stats = [merged[c].box_stats() for c in categories]
+
+        fig = go.Figure(go.Box(
+            x=categories,
+            q1=[s['q1'] for s in stats],
+            median=[s['median'] for s in stats],
+            q3=[s['q3'] for s in stats],
+            lowerfence=[s['lowerfence'] for s in stats],
+            upperfence=[s['upperfence'] for s in stats],
+            marker_color=color,
+            name=y_col,
+        ))
+        fig.update_layout(title=title, template='plotly_white', showlegend=False,
+                          yaxis_title=y_col, xaxis_title=x_col, font=dict(family='Poppins', size=12))
         st.plotly_chart(fig, use_container_width=True)
+        # Box dibangun dari quantile sketch: titik outlier individual tidak tersedia
+        n_outliers = sum(s['outliers'] for s in stats)
+        if n_outliers:
+            st.caption(f"Whisker = nilai terjauh di dalam 1.5×IQR. {n_outliers:,.0f} responden di luar batas "
+                       "tersebut (outlier) tidak ditampilkan sebagai titik.")
+        chart_exports[title] = pd.DataFrame(stats, index=pd.Index(categories, name=x_col)).assign(
+            n=[merged[c].count for c in categories]).reset_index()
+
+    # Rata-rata, n & CI skor per kategori dari cube provinsi x kategori (statistik aditif)
+    def cube_summary(category_col, score_col):
+        cube = aggregates['province_cube'].get(category_col)
+        if cube is None or score_col not in cube.columns.get_level_values(0):
+            return None
+        stats = province_slice(cube, selected_province)
+        if stats is None:
+            return None
+        return summary_table(stats, score_col, weighted)
 
     # Helper function for Grouped Bar Chart / Single Bar Chart
     def create_bar_chart(df, x_col, y_col, color_col, title, color_map=None, x_order=None, single_color=COLOR_PRIMARY):
@@ -737,8 +1048,23 @@ def page_survey(df):
             st.warning(f"Kolom '{x_col}' tidak ditemukan di data Survei atau tidak memiliki data unik.")
             return
 
+        # Rata-rata (tertimbang) + CI dari sufficient statistics, satu lintasan groupby
+        if color_col:
+            df_grouped = summary_table(sufficient_stats(df, [x_col, color_col], [y_col]), y_col, weighted)
+        else:
+            df_grouped = cube_summary(x_col, y_col)
+            if df_grouped is None:
+                df_grouped = summary_table(sufficient_stats(df, [x_col], [y_col]), y_col, weighted)
+        df_grouped = df_grouped.rename(columns={'mean': y_col})
+        df_grouped['ci_plus'] = df_grouped['ci_high'] - df_grouped[y_col]
+        df_grouped['ci_minus'] = df_grouped[y_col] - df_grouped['ci_low']
+        error_bars = dict(
+            error_y='ci_plus', error_y_minus='ci_minus',
+            hover_data={'n': ':.0f', 'ci_low': ':.2f', 'ci_high': ':.2f', 'ci_plus': False, 'ci_minus': False},
+            labels={'ci_low': f'CI {CONFIDENCE:.0%} bawah', 'ci_high': f'CI {CONFIDENCE:.0%} atas'},
+        )
+
         if color_col: # Grouped Bar
-            df_grouped = df.groupby([x_col, color_col])[y_col].mean().reset_index()
             barmode='group'
             fig = px.bar(
                 df_grouped,
@@ -750,10 +1076,10 @@ def page_survey(df):
                 color_discrete_map=color_map if color_map else None,
                 category_orders={x_col: x_order} if x_order else None,
                 text_auto='.2f',
-                template='plotly_white'
+                template='plotly_white',
+                **error_bars
             )
         else: # Single Bar Chart
-            df_grouped = df.groupby(x_col)[y_col].mean().reset_index()
             fig = px.bar(
                 df_grouped,
                 x=x_col,
@@ -763,11 +1089,15 @@ def page_survey(df):
                 color=x_col,
                 color_discrete_sequence=[single_color],
                 category_orders={x_col: x_order} if x_order else None,
-                template='plotly_white'
+                template='plotly_white',
+                **error_bars
             )
 
         fig.update_layout(yaxis_title=f"Rata-rata {y_col}", xaxis_title=x_col, font=dict(family='Poppins', size=12))
         st.plotly_chart(fig, use_container_width=True)
+        keys = [x_col, color_col] if color_col else [x_col]
+        small_sample_note(df_grouped.set_index(keys)['n'])
+        chart_exports[title] = df_grouped.drop(columns=['ci_plus', 'ci_minus'])
 
     
     if df_filtered.empty:
@@ -778,12 +1108,12 @@ def page_survey(df):
     if selected_index == 'Indeks Literasi Keuangan':
         
         # 1. Heatmap PERTAMA (Pendidikan) - Full Width
-        create_heatmap_chart(df_filtered, 'Pendidikan', literasi_cols, 
+        create_heatmap_chart(df_filtered, 'Pendidikan', 'literasi', 
                              '1. Rata-Rata Skor Literasi Berdasarkan Pendidikan', 'YlGnBu')
         st.markdown("---")
         
         # 2. Heatmap KEDUA (Pekerjaan) - Full Width
-        create_heatmap_chart(df_filtered, 'Pekerjaan', literasi_cols, 
+        create_heatmap_chart(df_filtered, 'Pekerjaan', 'literasi', 
                              '2. Rata-Rata Skor Literasi Berdasarkan Jenis Pekerjaan', 'YlGnBu')
 
         st.markdown("---")
@@ -813,7 +1143,7 @@ def page_survey(df):
     elif selected_index == 'Indeks Perilaku Keuangan':
         
         # 1. Heatmap PERILAKU PERTANYAAN vs. PENDAPATAN (Full width)
-        create_heatmap_chart(df_filtered, 'Pendapatan', perilaku_cols, 
+        create_heatmap_chart(df_filtered, 'Pendapatan', 'perilaku', 
                              '1. HeatMap: Perilaku Pertanyaan vs Pendapatan', 'YlOrRd')
         
         st.markdown("---")
@@ -834,7 +1164,7 @@ def page_survey(df):
     elif selected_index == 'Indeks Gaya Keputusan & Impulsif':
         
         # 1. Heatmap (Pendidikan - Full width)
-        create_heatmap_chart(df_filtered, 'Pendidikan', keputusan_cols, 
+        create_heatmap_chart(df_filtered, 'Pendidikan', 'keputusan', 
                              '1. Gaya Keputusan Pertanyaan vs Pendidikan', 'RdYlGn')
         
         st.markdown("---")
@@ -857,7 +1187,7 @@ def page_survey(df):
     elif selected_index == 'Indeks Kesejahteraan Keuangan':
         
         # 1. HEATMAP: KESEJAHTERAAN PERTANYAAN vs. PENDAPATAN (Full width)
-        create_heatmap_chart(df_filtered, 'Pendapatan', kesejahteraan_cols, 
+        create_heatmap_chart(df_filtered, 'Pendapatan', 'kesejahteraan', 
                              '1. Kesejahteraan Pertanyaan vs Pendapatan', 'PuBu')
         
         st.markdown("---")
@@ -874,6 +1204,8 @@ def page_survey(df):
                                      '3. Rata-Rata Skor Kesejahteraan Berdasarkan Jenis Pekerjaan', 
                                      x_order=pekerjaan_order, single_color=COLOR_SECONDARY)
 
+    export_panel('survey', data_version, (selected_province, selected_index, weighted), chart_exports)
+
 
 # --- 7. LOGIKA UTAMA APLIKASI ---
 
@@ -884,52 +1216,16 @@ selection = st.sidebar.radio(
     ["Regional Analysis", "Profile Analysis", "Survey Analysis"]
 )
 
-# Injeksi CSS kustom (termasuk font Poppins)
-st.markdown(f"""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&display=swap');
-
-/* Menggunakan Poppins untuk seluruh body dan semua elemen text Streamlit */
-html, body, [class*="st-"], h1, h2, h3, p, span, div {{
-    font-family: 'Poppins', sans-serif !important;
-}}
-
-/* Menargetkan elemen input, label, dan sidebar text secara eksplisit */
-.stApp, .stSidebar {{
-    font-family: 'Poppins', sans-serif !important;
-}}
-
-/* Custom styling for Streamlit container */
-.css-1d3z3vf {{
-    padding-top: 2rem;
-}}
-h1, h2, h3 {{
-    color: {COLOR_PRIMARY};
-}}
-
-/* Menambahkan padding horizontal pada elemen kolom (st.columns) */
-/* Menargetkan wrapper kolom Streamlit */
-.st-emotion-cache-18ni7ap {{ /* Ini adalah class yang membungkus konten kolom */
-    padding-left: 10px; 
-    padding-right: 10px; 
-}}
-
-/* Menambahkan margin bawah pada elemen markdown/header untuk spacing vertikal */
-h2, h3 {{
-    margin-bottom: 0.5rem;
-}}
-
-/* Memberi jarak pada setiap chart/elemen di dalam kolom */
-[data-testid="column"] > div {{
-    padding: 10px;
-}}
-</style>
-""", unsafe_allow_html=True)
+# Injeksi CSS kustom. Font dideklarasikan di [theme] .streamlit/config.toml (tanpa host eksternal,
+# fallback sans-serif); file CSS dibaca sekali per proses. Blok <style> tetap dikirim di setiap
+# rerun: elemen yang tidak ditulis ulang dihapus Streamlit di akhir run, sehingga CSS kustom
+# tidak bisa dikirim hanya sekali per sesi.
+st.markdown(load_global_css(), unsafe_allow_html=True)
 
 
 if selection == "Regional Analysis":
-    page_regional(df_regional)
+    page_regional(aggregates['regional_rollups'], aggregates['regional_rankings'])
 elif selection == "Profile Analysis":
-    page_profile(df_profile)
+    page_profile(df_profile, row_ranges.get('profile'), aggregates['quantile_sketches'])
 elif selection == "Survey Analysis":
-    page_survey(df_survey)
+    page_survey(df_survey, row_ranges.get('survey'), aggregates)
@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+# --- LOAD TEST DASHBOARD ---
+# Mensimulasikan banyak analis yang memakai dashboard bersamaan. Setiap pengguna virtual
+# adalah sesi websocket sungguhan ke satu server `streamlit run` (protokol yang sama
+# dengan browser), sehingga cache_data/cache_resource, pool render, dan memori server
+# diuji seperti di produksi. Skenario per sesi: pindah halaman, ganti provinsi, dan
+# ganti indeks survei. Hasil per level konkurensi: latensi rerun (p50/p95/p99),
+# throughput, dan pertumbuhan RSS proses server.
+#
+# Contoh:
+#   python loadtest.py --levels 1,4,16 --iterations 3
+#   DASHBOARD_BUNDLE_DIR=bundles python loadtest.py --levels 8,32 --json hasil.json
+#   python loadtest.py --url http://dashboard-host:8501 --levels 4   (server yang sudah jalan;
+#                                                                   RSS hanya jika --server-pid)
+#
+# Catatan: AppTest tidak dipakai karena tiap AppTest membuat & membongkar Runtime global
+# sendiri, sehingga beberapa sesi AppTest tidak bisa berjalan bersamaan dalam satu proses.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(APP_DIR, "dashboard.py")
+
+PAGE_RADIO_LABEL = "Pilih Halaman Analisis"
+PAGES = ["Regional Analysis", "Profile Analysis", "Survey Analysis"]
+SURVEY_INDICES = ['Indeks Literasi Keuangan', 'Indeks Perilaku Keuangan', 'Indeks Gaya Keputusan & Impulsif', 'Indeks Kesejahteraan Keuangan']
+ALL_PROVINCES = 'Semua Provinsi'
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, timeout):
+    cmd = [sys.executable, "-m", "streamlit", "run", APP_FILE, "--server.headless", "true",
+           "--server.port", str(port), "--server.address", "127.0.0.1", "--browser.gatherUsageStats", "false"]
+    server = subprocess.Popen(cmd, cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server Streamlit berhenti saat start (exit code {server.returncode}).")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2) as resp:
+                if resp.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"Server Streamlit tidak siap dalam {timeout} detik.")
+
+
+class Session:
+    # Satu tab browser: kirim BackMsg rerun_script berisi state widget, tunggu script_finished
+
+    def __init__(self, ws_url, timeout):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self.ws = None
+        self.widgets = {}        # label/key -> (jenis, id, opsi) dari run terakhir
+        self.widget_states = {}  # id -> WidgetState yang pernah diubah sesi ini
+        self.latencies = []
+        self.errors = []
+
+    async def connect(self):
+        self.ws = await websocket_connect(f"{self.ws_url}/_stcore/stream")
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    def remember_widget(self, element):
+        kind = element.WhichOneof('type')
+        if kind not in ('radio', 'selectbox'):
+            return
+        widget = getattr(element, kind)
+        info = (kind, widget.id, list(widget.options))
+        self.widgets[widget.label] = info
+        user_key = widget.id.rsplit('-', 1)[-1]
+        if user_key and user_key != 'None':
+            self.widgets[user_key] = info
+
+    async def rerun(self, label):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        for state in self.widget_states.values():
+            msg.rerun_script.widget_states.widgets.add().CopyFrom(state)
+
+        started = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        while True:
+            raw = await asyncio.wait_for(self.ws.read_message(), timeout=self.timeout)
+            if raw is None:
+                raise ConnectionError("Websocket ditutup server.")
+            fwd = ForwardMsg.FromString(raw)
+            kind = fwd.WhichOneof('type')
+            if kind == 'new_session':
+                self.widgets = {}
+            elif kind == 'delta' and fwd.delta.WhichOneof('type') == 'new_element':
+                element = fwd.delta.new_element
+                if element.WhichOneof('type') == 'exception' and not element.exception.is_warning:
+                    self.errors.append(f"{label}: {element.exception.type}: {element.exception.message}")
+                else:
+                    self.remember_widget(element)
+            elif kind == 'script_finished':
+                status = fwd.script_finished
+                if status == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    self.errors.append(f"{label}: compile error")
+                break
+        self.latencies.append(time.perf_counter() - started)
+
+    def set_widget(self, name, value):
+        kind, widget_id, options = self.widgets[name]
+        state = WidgetState(id=widget_id)
+        # Nilai di luar opsi ditolak: Streamlit meneruskan string apa adanya, sehingga halaman
+        # akan merender hasil kosong yang tampak seperti rerun cepat yang berhasil
+        if value not in options:
+            raise ValueError(f"{value!r} bukan opsi widget '{name}'")
+        if kind == 'radio':
+            state.int_value = options.index(value)
+        else:
+            state.string_value = value
+        self.widget_states[widget_id] = state
+
+
+def build_scenario(rng, provinces):
+    # Satu "kunjungan" analis: urutan aksi (nama widget, nilai). provinces: opsi provinsi
+    # per widget filter, karena halaman Profil dan Survei memiliki daftar provinsi berbeda.
+    steps = [(PAGE_RADIO_LABEL, 'Regional Analysis'), (PAGE_RADIO_LABEL, 'Profile Analysis')]
+    steps += [("profile_province_filter", rng.choice(provinces["profile_province_filter"])) for _ in range(2)]
+    steps.append(("profile_province_filter", ALL_PROVINCES))
+    steps.append((PAGE_RADIO_LABEL, 'Survey Analysis'))
+    steps += [("survey_index_radio", index) for index in rng.sample(SURVEY_INDICES, k=len(SURVEY_INDICES))]
+    steps.append(("survey_province_filter", rng.choice(provinces["survey_province_filter"])))
+    steps.append(("survey_index_radio", rng.choice(SURVEY_INDICES)))
+    steps.append((PAGE_RADIO_LABEL, rng.choice(PAGES)))
+    return steps
+
+
+async def virtual_user(user_id, ws_url, provinces, args):
+    rng = random.Random(args.seed + user_id)
+    session = Session(ws_url, args.timeout)
+    try:
+        await session.connect()
+        await session.rerun("initial")
+        for _ in range(args.iterations):
+            for name, value in build_scenario(rng, provinces):
+                try:
+                    session.set_widget(name, value)
+                except (KeyError, ValueError) as e:
+                    # Widget tidak tampil di run terakhir (mis. halaman gagal render)
+                    session.errors.append(f"{name}={value}: widget tidak ditemukan ({e!r})")
+                    continue
+                await session.rerun(f"{name}={value}")
+                if args.think:
+                    await asyncio.sleep(rng.uniform(0, 2 * args.think))
+    except (asyncio.TimeoutError, ConnectionError, OSError) as e:
+        session.errors.append(f"sesi {user_id} terhenti: {e!r}")
+    finally:
+        session.close()
+    return session
+
+
+async def discover_provinces(ws_url, timeout):
+    # Opsi provinsi diambil dari widget filter masing-masing halaman. Sekaligus pemanasan:
+    # run pertama mengisi cache data server.
+    session = Session(ws_url, timeout)
+    await session.connect()
+    provinces = {}
+    try:
+        await session.rerun("warmup")
+        for page, widget in [('Profile Analysis', "profile_province_filter"), ('Survey Analysis', "survey_province_filter")]:
+            session.set_widget(PAGE_RADIO_LABEL, page)
+            await session.rerun("warmup")
+            provinces[widget] = [opt for opt in session.widgets[widget][2] if opt != ALL_PROVINCES]
+        return provinces
+    finally:
+        session.close()
+
+
+async def sample_rss(pid, samples, stop):
+    while not stop.is_set():
+        value = rss_mb(pid)
+        if value is not None:
+            samples.append(value)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.25)
+        except asyncio.TimeoutError:
+            pass
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_level(concurrency, ws_url, provinces, args, server_pid, baseline_rss):
+    rss_before = rss_mb(server_pid) if server_pid else None
+    samples, stop = [], asyncio.Event()
+    sampler = asyncio.ensure_future(sample_rss(server_pid, samples, stop)) if server_pid else None
+
+    started = time.perf_counter()
+    sessions = await asyncio.gather(*(virtual_user(i, ws_url, provinces, args) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    if sampler is not None:
+        stop.set()
+        await sampler
+    rss_after = rss_mb(server_pid) if server_pid else None
+
+    latencies = sorted(lat for s in sessions for lat in s.latencies)
+    errors = [err for s in sessions for err in s.errors]
+    return {
+        'concurrency': concurrency,
+        'reruns': len(latencies),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'elapsed_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else float('nan'),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': latencies[-1] * 1000 if latencies else float('nan'),
+        'rss_before_mb': rss_before,
+        'rss_after_mb': rss_after,
+        'rss_peak_mb': max(samples, default=rss_after),
+        'rss_growth_mb': rss_after - baseline_rss if rss_after is not None and baseline_rss is not None else None,
+    }
+
+
+def fmt_mb(value, sign=False):
+    if value is None:
+        return f"{'-':>8}"
+    return f"{value:>+8.1f}" if sign else f"{value:>8.1f}"
+
+
+def print_report(results, baseline_rss):
+    print(f"RSS server setelah pemanasan: {fmt_mb(baseline_rss).strip()} MB\n")
+    header = (f"{'users':>5} {'reruns':>7} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'rerun/s':>8} {'RSS MB':>8} {'peak MB':>8} {'ΔRSS MB':>8}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['reruns']:>7} {r['errors']:>4} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['throughput_rps']:>8.2f} {fmt_mb(r['rss_after_mb'])} "
+              f"{fmt_mb(r['rss_peak_mb'])} {fmt_mb(r['rss_growth_mb'], sign=True)}")
+    for r in results:
+        for sample in r['error_samples']:
+            print(f"[{r['concurrency']} users] {sample}", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test dashboard lewat sesi websocket Streamlit sungguhan.")
+    parser.add_argument("--levels", default="1,2,4,8", help="Daftar jumlah sesi bersamaan, dipisah koma (default: 1,2,4,8).")
+    parser.add_argument("--iterations", type=int, default=2, help="Jumlah skenario per sesi per level (default: 2).")
+    parser.add_argument("--think", type=float, default=0.0, help="Rata-rata jeda antar aksi dalam detik (default: 0).")
+    parser.add_argument("--timeout", type=float, default=120, help="Batas waktu satu rerun / start server dalam detik (default: 120).")
+    parser.add_argument("--seed", type=int, default=42, help="Seed acak skenario (default: 42).")
+    parser.add_argument("--url", help="URL server yang sudah berjalan; jika kosong server dijalankan otomatis.")
+    parser.add_argument("--server-pid", type=int, help="PID server untuk pengukuran RSS saat memakai --url.")
+    parser.add_argument("--json", help="Simpan hasil mentah ke file JSON.")
+    return parser.parse_args(argv)
+
+
+async def run(args, base_url, server_pid):
+    ws_url = base_url.replace("http", "ws", 1).rstrip("/")
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    provinces = await discover_provinces(ws_url, args.timeout)
+    baseline_rss = rss_mb(server_pid) if server_pid else None
+    results = []
+    for level in levels:
+        results.append(await run_level(level, ws_url, provinces, args, server_pid, baseline_rss))
+    return results, baseline_rss
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = None
+    if args.url:
+        base_url, server_pid = args.url, args.server_pid
+    else:
+        port = free_port()
+        server = start_server(port, args.timeout)
+        base_url, server_pid = f"http://127.0.0.1:{port}", server.pid
+    try:
+        results, baseline_rss = asyncio.run(run(args, base_url, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print_report(results, baseline_rss)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'baseline_rss_mb': baseline_rss, 'levels': results}, f, indent=2)
+    return 1 if any(r['errors'] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
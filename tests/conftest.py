@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Root repo di sys.path agar tes bisa mengimpor paket analytics tanpa instalasi
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
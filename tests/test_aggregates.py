@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.aggregates import ALL_PROVINCES, merge_sketch_cells, province_slice
+from analytics.pipeline import compute_all
+from analytics.stats import summarize
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def computed():
+    # Data Excel asli di root repo; agregat dihitung sekali untuk seluruh modul
+    frames, score_groups, aggregates, _ = compute_all(DATA_DIR)
+    return frames, score_groups, aggregates
+
+
+def test_unweighted_heatmap_means_match_pivot_table(computed):
+    frames, score_groups, aggregates = computed
+    df_survey = frames['survey']
+    assert aggregates['heatmap_stats']
+    for (group, category_col), stats in aggregates['heatmap_stats'].items():
+        cols = score_groups[group]
+        for province in [ALL_PROVINCES, df_survey['province'].iloc[0]]:
+            df = df_survey if province == ALL_PROVINCES else df_survey[df_survey['province'] == province]
+            expected = df.pivot_table(index=category_col, values=cols, aggfunc='mean')[cols]
+            means = summarize(province_slice(stats, province), weighted=False)['mean'][cols]
+            pd.testing.assert_frame_equal(means, expected, check_names=False)
+
+
+def test_survey_sketch_quartiles_match_series_quantile(computed):
+    # Skor survei punya sedikit nilai unik -> sketch bekerja dalam mode eksak
+    frames, _, aggregates = computed
+    df_survey = frames['survey']
+    qs = [0.0, 0.25, 0.5, 0.75, 1.0]
+    for (frame, category_col, value_col), cells in aggregates['quantile_sketches'].items():
+        if frame != 'survey':
+            continue
+        for category, sketch in merge_sketch_cells(cells, ALL_PROVINCES).items():
+            expected = df_survey.loc[df_survey[category_col] == category, value_col].quantile(qs)
+            np.testing.assert_allclose(sketch.quantile(qs), expected.to_numpy())
@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from analytics.cache import CacheBackend, FileSystemBackend, backend_from_url, cache_key, memoize
+
+CONTENDERS = 8
+
+
+@pytest.fixture(params=['local-redis', 'file', 'sqlite', 'memory'])
+def backend(request, tmp_path):
+    if request.param == 'file':
+        return backend_from_url(f"file://{tmp_path / 'cache'}")
+    if request.param == 'sqlite':
+        return backend_from_url(f"sqlite://{tmp_path / 'cache.db'}")
+    return backend_from_url(f"{request.param}://")
+
+
+def test_get_set_delete_add(backend):
+    key = cache_key('test', 'basic')
+    assert backend.get(key) is None
+    backend.set(key, b"a")
+    assert backend.get(key) == b"a"
+    assert not backend.add(key, b"b")
+    assert backend.get(key) == b"a"
+    backend.delete(key)
+    assert backend.get(key) is None
+    assert backend.add(key, b"c")
+    assert backend.get(key) == b"c"
+
+
+def test_add_respects_ttl(backend):
+    key = cache_key('test', 'ttl')
+    assert backend.add(key, b"1", ttl=1)
+    assert not backend.add(key, b"1", ttl=1)
+    time.sleep(1.2)
+    assert backend.get(key) is None
+    assert backend.add(key, b"2", ttl=60)
+
+
+def test_expired_lock_taken_over_by_exactly_one_caller(backend):
+    key = cache_key('test', 'takeover')
+    backend.add(key, b"stale", ttl=1)
+    time.sleep(1.2)
+    start = threading.Barrier(CONTENDERS)
+
+    def contend(_):
+        start.wait()
+        return backend.add(key, b"fresh", ttl=60)
+
+    with ThreadPoolExecutor(max_workers=CONTENDERS) as pool:
+        assert sum(pool.map(contend, range(CONTENDERS))) == 1
+
+
+def test_memoize_computes_once_for_concurrent_callers(backend):
+    key = cache_key('test', 'memoize')
+    calls = []
+    start = threading.Barrier(CONTENDERS)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.5)
+        return {'rows': 42}
+
+    def worker(_):
+        start.wait()
+        return memoize(backend, key, compute, poll_interval=0.05)
+
+    with ThreadPoolExecutor(max_workers=CONTENDERS) as pool:
+        results = list(pool.map(worker, range(CONTENDERS)))
+    assert len(calls) == 1
+    assert results == [{'rows': 42}] * CONTENDERS
+    assert backend.add(f"{key}:lock", b"1"), "kunci komputasi harus dilepas setelah selesai"
+
+
+def test_file_backend_reads_entries_without_token(tmp_path):
+    # Entri format lama (expires_at, value) tetap terbaca
+    import pickle
+
+    backend = FileSystemBackend(str(tmp_path))
+    key = cache_key('test', 'legacy')
+    with open(backend._path(key), 'wb') as f:
+        pickle.dump((None, b"old"), f)
+    assert backend.get(key) == b"old"
+
+
+@pytest.mark.parametrize('url', ["file://cache", "sqlite://cache.db", "file:cache"])
+def test_relative_paths_rejected(url):
+    with pytest.raises(ValueError, match="path absolut"):
+        backend_from_url(url)
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
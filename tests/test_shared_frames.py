@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.shared_frames import filter_rows, open_arrow_frames, write_arrow_frames
+
+
+def roundtrip(tmp_path, df, name='profile'):
+    write_arrow_frames({name: df}, str(tmp_path))
+    frames, row_ranges = open_arrow_frames(str(tmp_path))
+    return frames[name], row_ranges[name]
+
+
+def test_dtypes_survive_bundle_roundtrip(tmp_path):
+    df = pd.DataFrame({
+        'province': ['B', 'A', 'B', 'A'],
+        'Age': np.array([20, 31, 45, 28], dtype=np.int64),
+        'Prob_Default': [0.1, np.nan, 0.3, 0.4],
+        'Flag': [True, False, True, False],
+        'Joined': pd.to_datetime(['2024-01-01', '2024-02-01', None, '2024-03-01']),
+        'Joined_UTC': pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01', '2024-04-01']).tz_localize('UTC'),
+        'Cluster': pd.Categorical(['x', 'y', 'x', None], categories=['y', 'x'], ordered=True),
+        'Count': pd.array([1, None, 3, 4], dtype='Int64'),
+    })
+    loaded, _ = roundtrip(tmp_path, df)
+    expected = df.sort_values('province', kind='stable', ignore_index=True)
+    for col in df.columns.drop('province'):
+        assert loaded[col].dtype == expected[col].dtype, col
+        pd.testing.assert_series_equal(loaded[col], expected[col], check_names=False)
+    assert loaded['province'].tolist() == expected['province'].tolist()
+
+
+def test_numeric_columns_are_read_only_views(tmp_path):
+    df = pd.DataFrame({'province': ['A', 'A', 'B'], 'Age': [1.0, 2.0, 3.0]})
+    loaded, ranges = roundtrip(tmp_path, df)
+    assert not loaded['Age'].to_numpy().flags.writeable
+    assert filter_rows(loaded, ranges, 'B', 'province')['Age'].tolist() == [3.0]
+
+
+def test_mixed_object_column_rejected(tmp_path):
+    df = pd.DataFrame({'province': ['A', 'B'], 'Mixed': ['a', 1]})
+    with pytest.raises(TypeError, match="Mixed"):
+        write_arrow_frames({'profile': df}, str(tmp_path))
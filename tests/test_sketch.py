@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.sketch import QuantileSketch
+
+QS = np.linspace(0, 1, 41)
+
+
+def rank_error(values, estimates, qs):
+    # Selisih peringkat empiris nilai hasil sketch terhadap kuantil yang diminta
+    values = np.sort(values)
+    ranks = np.searchsorted(values, estimates, side='left') / (len(values) - 1)
+    return np.max(np.abs(np.clip(ranks, 0, 1) - qs))
+
+
+def test_exact_mode_matches_series_quantile():
+    rng = np.random.default_rng(1)
+    values = pd.Series(rng.integers(1, 6, size=500).astype(float))  # skala Likert 1-5
+    sketch = QuantileSketch.from_values(values)
+    np.testing.assert_allclose(sketch.quantile(QS), values.quantile(QS).to_numpy())
+
+
+def test_exact_mode_survives_merge():
+    rng = np.random.default_rng(2)
+    parts = [pd.Series(rng.integers(18, 60, size=n).astype(float)) for n in (5, 120, 300)]
+    merged = QuantileSketch.merge_all([QuantileSketch.from_values(p) for p in parts])
+    allv = pd.concat(parts)
+    assert merged.count == len(allv)
+    np.testing.assert_allclose(merged.quantile(QS), allv.quantile(QS).to_numpy())
+
+
+def test_nan_values_ignored():
+    values = pd.Series([1.0, np.nan, 3.0, 2.0])
+    np.testing.assert_allclose(QuantileSketch.from_values(values).quantile([0.25, 0.5]), values.quantile([0.25, 0.5]))
+
+
+def test_empty_sketch():
+    sketch = QuantileSketch.merge_all([QuantileSketch.from_values([])])
+    assert sketch.count == 0
+    assert np.isnan(sketch.quantile([0.5])).all()
+
+
+@pytest.mark.parametrize('n_parts', [1, 8])
+def test_compressed_rank_error_bounded(n_parts):
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(size=20_000)
+    sketches = [QuantileSketch.from_values(part) for part in np.array_split(values, n_parts)]
+    sketch = QuantileSketch.merge_all(sketches)
+    assert sketch.means.size <= sketch.compression
+    assert rank_error(values, sketch.quantile(QS[1:-1]), QS[1:-1]) < 0.01
+    assert sketch.quantile([0.0, 1.0]).tolist() == [values.min(), values.max()]
+
+
+def tukey_box(values):
+    values = pd.Series(values)
+    q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = values[(values >= low) & (values <= high)]
+    return {'q1': q1, 'median': median, 'q3': q3, 'lowerfence': inside.min(), 'upperfence': inside.max(),
+            'outliers': float(((values < low) | (values > high)).sum())}
+
+
+@pytest.mark.parametrize('values', [
+    np.r_[np.arange(1, 21), 100.0],
+    np.r_[-50.0, np.linspace(0, 1, 150), 7.0, 9.0],
+    np.random.default_rng(4).integers(1, 6, size=300).astype(float),
+])
+def test_box_stats_whiskers_at_most_extreme_value_inside_fences(values):
+    stats = QuantileSketch.from_values(values).box_stats()
+    expected = tukey_box(values)
+    assert stats == pytest.approx(expected)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.stats import WEIGHT_COL, collapse, population_weights, sufficient_stats, summarize, summary_table, t_quantile
+
+
+@pytest.fixture
+def survey():
+    rng = np.random.default_rng(0)
+    n = 600
+    df = pd.DataFrame({
+        'province': rng.choice(['A', 'B', 'C'], size=n, p=[0.6, 0.3, 0.1]),
+        'Gender': rng.choice(['F', 'M'], size=n),
+        'Literacy': rng.normal(3.5, 0.8, size=n),
+        'Wellbeing': rng.normal(60, 12, size=n),
+    })
+    df.loc[rng.choice(n, size=30, replace=False), 'Literacy'] = np.nan
+    population = pd.Series({'A': 100.0, 'B': 300.0, 'C': 600.0})
+    df[WEIGHT_COL] = population_weights(df['province'], population)
+    return df
+
+
+VALUES = ['Literacy', 'Wellbeing']
+
+
+def test_unweighted_summary_matches_groupby_mean(survey):
+    summary = summarize(sufficient_stats(survey, ['Gender'], VALUES), weighted=False)
+    expected = survey.groupby('Gender')[VALUES].mean()
+    pd.testing.assert_frame_equal(summary['mean'], expected, check_names=False)
+    pd.testing.assert_frame_equal(summary['n'], survey.groupby('Gender')[VALUES].count().astype(float), check_names=False)
+
+
+def test_unweighted_ci_matches_t_interval(survey):
+    table = summary_table(sufficient_stats(survey, ['Gender'], VALUES), 'Literacy', weighted=False).set_index('Gender')
+    for gender, values in survey.groupby('Gender')['Literacy']:
+        values = values.dropna()
+        se = values.std(ddof=1) / np.sqrt(len(values))
+        assert table.at[gender, 'se'] == pytest.approx(se)
+        half_width = table.at[gender, 'ci_high'] - table.at[gender, 'mean']
+        assert half_width == pytest.approx(se * t_quantile(0.975, len(values) - 1))
+
+
+def test_weighted_summary_matches_numpy(survey):
+    summary = summarize(sufficient_stats(survey, ['Gender'], VALUES), weighted=True)
+    for gender, group in survey.groupby('Gender'):
+        valid = group['Literacy'].notna()
+        x, w = group.loc[valid, 'Literacy'], group.loc[valid, WEIGHT_COL]
+        assert summary.at[gender, ('mean', 'Literacy')] == pytest.approx(np.average(x, weights=w))
+        assert summary.at[gender, ('n_eff', 'Literacy')] == pytest.approx(w.sum() ** 2 / (w ** 2).sum())
+
+
+def test_collapse_equals_direct_stats(survey):
+    by_cell = sufficient_stats(survey, ['province', 'Gender'], VALUES)
+    direct = sufficient_stats(survey, ['Gender'], VALUES)
+    pd.testing.assert_frame_equal(collapse(by_cell, 'Gender'), direct, check_names=False)
+
+
+def test_population_weights_reproduce_population_shares(survey):
+    weights = survey[WEIGHT_COL]
+    assert weights.mean() == pytest.approx(1.0)
+    shares = weights.groupby(survey['province']).sum() / weights.sum()
+    np.testing.assert_allclose(shares.loc[['A', 'B', 'C']], [0.1, 0.3, 0.6])
+
+
+def test_population_weights_without_population_are_uniform():
+    provinces = pd.Series(['A', 'B', 'B'])
+    np.testing.assert_array_equal(population_weights(provinces, pd.Series(dtype=float)), np.ones(3))
+
+
+@pytest.mark.parametrize('dof, expected', [
+    (1, 12.7062), (2, 4.3027), (3, 3.1824), (5, 2.5706), (10, 2.2281), (30, 2.0423), (1000, 1.9623),
+])
+def test_t_quantile_close_to_table(dof, expected):
+    # Nilai tabel t dua sisi 95%; eksak untuk dof 1-2, galat Cornish-Fisher < 0.03 di dof 3
+    tolerance = 1e-3 if dof <= 2 else 0.03
+    assert float(t_quantile(0.975, dof)) == pytest.approx(expected, abs=tolerance)
+
+
+def test_single_respondent_has_no_interval():
+    df = pd.DataFrame({'Gender': ['F', 'M', 'M'], 'Literacy': [3.0, 4.0, 5.0]})
+    table = summary_table(sufficient_stats(df, ['Gender'], ['Literacy']), 'Literacy', weighted=False).set_index('Gender')
+    assert table.at['F', 'mean'] == 3.0
+    assert np.isnan(table.at['F', 'ci_low'])
+    assert table.at['M', 'mean'] == 4.5